@@ -3,12 +3,13 @@
 # ===================================================
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.io as pio
-from scipy import stats
-import numpy as np
+
+from bootstrap import mean_difference_cis
+from figures import cached_figure
+from filters import sidebar_filters
+from instrument import debug_panel, section
+from registry import select_dataset
+from sampling import sample_points
 
 # ------------------------------------------------------------
 # Page Setup
@@ -33,14 +34,11 @@ st.write(
     """
 )
 
-# Load dataset from GitHub
-url = "https://raw.githubusercontent.com/nadiashahzanani/Sleep-Anxiety-Visualization/refs/heads/main/Time_to_think_Norburyy.csv"
-df = pd.read_csv(url)
-
-# Plotly theme setup
-pio.templates.default = "plotly_white"
-colors = ["#4a90e2", "#f45b69", "#90c978", "#ffb74d"]
+# Load the selected dataset (cached per content hash, local file first) and apply sidebar filters
+with section("load"):
+    df = sidebar_filters(select_dataset())
 
+# Charts are built in figures.py (plotly_white theme) and served from its cache
 st.write("✅ File loaded successfully!")
 st.write(df.shape)
 st.write(df.head())
@@ -48,15 +46,8 @@ st.write(df.head())
 # ------------------------------------------------------------
 # 1️⃣ Sleep Quality Distribution (Histogram)
 # ------------------------------------------------------------
-fig1 = px.histogram(
-    df, 
-    x="psqi_2_groups", 
-    nbins=15, 
-    color_discrete_sequence=[colors[0]],
-    title="1️⃣ Distribution of Sleep Quality (psqi_2_groups)"
-)
-fig1.update_layout(xaxis_title="PSQI (Higher = Poorer Sleep)", yaxis_title="Count")
-st.plotly_chart(fig1, use_container_width=True)
+with section("home.1"):
+    st.plotly_chart(cached_figure("home.1", df), use_container_width=True)
 
 st.write(
     """
@@ -69,15 +60,8 @@ st.write(
 # ------------------------------------------------------------
 # 2️⃣ Trait Anxiety Distribution (Histogram)
 # ------------------------------------------------------------
-fig2 = px.histogram(
-    df, 
-    x="Trait_Anxiety", 
-    nbins=15, 
-    color_discrete_sequence=[colors[1]],
-    title="2️⃣ Distribution of Trait Anxiety Scores"
-)
-fig2.update_layout(xaxis_title="Trait Anxiety Score", yaxis_title="Frequency")
-st.plotly_chart(fig2, use_container_width=True)
+with section("home.2"):
+    st.plotly_chart(cached_figure("home.2", df), use_container_width=True)
 
 st.write(
     """
@@ -90,20 +74,11 @@ st.write(
 # ------------------------------------------------------------
 # 3️⃣ Correlation Between Sleep Quality and Anxiety (Scatter)
 # ------------------------------------------------------------
-r, p = stats.pearsonr(df["psqi_2_groups"].dropna(), df["Trait_Anxiety"].dropna())
-fig3 = px.scatter(
-    df,
-    x="psqi_2_groups",
-    y="Trait_Anxiety",
-    color_discrete_sequence=[colors[2]],
-    trendline="ols",
-    title=f"3️⃣ Relationship Between Sleep Quality and Anxiety (r = {r:.2f}, p = {p:.3g})"
-)
-fig3.update_layout(
-    xaxis_title="Sleep Quality (Higher = Poorer Sleep)",
-    yaxis_title="Trait Anxiety Score"
-)
-st.plotly_chart(fig3, use_container_width=True)
+with section("home.3"):
+    _, scatter_note = sample_points(df, None, "Trait_Anxiety")
+    st.plotly_chart(cached_figure("home.3", df), use_container_width=True)
+if scatter_note:
+    st.caption(scatter_note)
 
 st.write(
     """
@@ -116,16 +91,13 @@ st.write(
 # ------------------------------------------------------------
 # 4️⃣ Trait Anxiety by Sleep Category (Box Plot)
 # ------------------------------------------------------------
-fig4 = px.box(
-    df,
-    x="Sleep_Category",
-    y="Trait_Anxiety",
-    color="Sleep_Category",
-    color_discrete_sequence=[colors[0], colors[1]],
-    title="4️⃣ Trait Anxiety by Sleep Category"
-)
-fig4.update_layout(xaxis_title="Sleep Category", yaxis_title="Anxiety Score")
-st.plotly_chart(fig4, use_container_width=True)
+with section("home.4"):
+    st.plotly_chart(cached_figure("home.4", df), use_container_width=True)
+    for diff in mean_difference_cis(df, "Trait_Anxiety", "Sleep_Category").itertuples():
+        st.caption(
+            f"Mean anxiety difference, {diff.Index} − {diff.reference}: {diff.estimate:+.2f} "
+            f"(95% bootstrap CI [{diff.low:.2f}, {diff.high:.2f}])"
+        )
 
 st.write(
     """
@@ -138,20 +110,8 @@ st.write(
 # ------------------------------------------------------------
 # 5️⃣ Chronotype and Start Time Preferences (Grouped Bar Chart)
 # ------------------------------------------------------------
-ctab = pd.crosstab(df["Start_time_code"], df["MEQ"])
-ctab = ctab.reset_index().melt(id_vars="Start_time_code", var_name="Chronotype", value_name="Count")
-
-fig5 = px.bar(
-    ctab,
-    x="Start_time_code",
-    y="Count",
-    color="Chronotype",
-    color_discrete_sequence=colors,
-    barmode="group",
-    title="5️⃣ Preferred Start Time by Chronotype"
-)
-fig5.update_layout(xaxis_title="Preferred Start Time", yaxis_title="Count")
-st.plotly_chart(fig5, use_container_width=True)
+with section("home.5"):
+    st.plotly_chart(cached_figure("home.5", df), use_container_width=True)
 
 st.write(
     """
@@ -164,20 +124,8 @@ st.write(
 # ------------------------------------------------------------
 # 6️⃣ Correlation Heatmap (Matrix)
 # ------------------------------------------------------------
-numeric = df.select_dtypes(include=np.number)
-corr = numeric.corr().round(2)
-
-fig6 = go.Figure(
-    data=go.Heatmap(
-        z=corr.values,
-        x=corr.columns,
-        y=corr.columns,
-        colorscale="RdBu",
-        reversescale=True
-    )
-)
-fig6.update_layout(title="6️⃣ Correlation Matrix: Sleep, Anxiety & Behavioral Variables")
-st.plotly_chart(fig6, use_container_width=True)
+with section("home.6"):
+    st.plotly_chart(cached_figure("home.6", df), use_container_width=True)
 
 st.write(
     """
@@ -213,3 +161,5 @@ st.markdown(
 # ------------------------------------------------------------
 st.markdown("---")
 st.caption("Created by Nadia Shahzanani © 2025 | Scientific Visualization Project")
+
+debug_panel()
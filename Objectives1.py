@@ -1,27 +1,57 @@
 # --- Import libraries ---
 import streamlit as st
-import plotly.figure_factory as ff
-import plotly.graph_objects as go
-import numpy as np
-import pandas as pd
-import plotly.express as px
+
+from bootstrap import mean_difference_cis
+from figures import cached_figure
+from filters import sidebar_filters
+from group_stats import overall_summary
+from instrument import debug_panel, section
+from progressive import ProgressivePage
+from registry import select_dataset
+from sampling import sample_points
 
 
 # --- Page title ---
 st.title("Objectives 1 - Distribution and Group Differences In Sleep Quality and Anxiety")
 
-# --- Load dataset ---
-url = "https://raw.githubusercontent.com/nadiashahzanani/Sleep-Anxiety-Visualization/refs/heads/main/Time_to_think_Norburyy.csv"
-df = pd.read_csv(url)
+# --- Load dataset and apply sidebar cohort filters ---
+with section("load"):
+    df = sidebar_filters(select_dataset())
+
+# --- Start every chart section on the shared pool; each is drawn as it finishes ---
+page = ProgressivePage()
+page.submit("1.1", lambda: cached_figure("obj1.1.1", df))
+page.submit("1.2", lambda: (cached_figure("obj1.1.2", df),
+                            sample_points(df, 'Year_of_Study', 'Trait_Anxiety')[1],
+                            mean_difference_cis(df, 'Trait_Anxiety', 'Year_of_Study')))
+page.submit("1.3", lambda: cached_figure("obj1.1.3", df))
+
+
+def show_chart(fig):
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def show_year_boxplot(result):
+    fig, points_note, differences = result
+    show_chart(fig)
+    if points_note:
+        st.caption(points_note)
+    for diff in differences.itertuples():
+        st.caption(
+            f"Mean anxiety, Year {diff.Index} − Year {diff.reference}: {diff.estimate:+.2f} "
+            f"(95% bootstrap CI [{diff.low:.2f}, {diff.high:.2f}])"
+        )
 
 # Set the title for the Streamlit app
 st.subheader("Student Sleep and Anxiety Overview")
 
-# --- Example calculations for metrics ---
-avg_sleep_quality = df['psqi_2_groups'].mean()           # was 'sleep_score'
-avg_trait_anxiety = df['Trait_Anxiety'].mean()          # was 'trait_anxiety'
-poor_sleep_pct = (df['psqi_2_groups'] > 1).mean() * 100  # PSQI >1 considered poor sleep in your coding
-high_anxiety_pct = (df['Trait_Anxiety'] > 40).mean() * 100  # threshold example
+# --- Example calculations for metrics (means from the cached summary store) ---
+with section("metrics"):
+    summary = overall_summary(df, ['psqi_2_groups', 'Trait_Anxiety'])
+    avg_sleep_quality = summary.loc['psqi_2_groups', 'mean']           # was 'sleep_score'
+    avg_trait_anxiety = summary.loc['Trait_Anxiety', 'mean']          # was 'trait_anxiety'
+    poor_sleep_pct = (df['psqi_2_groups'] > 1).mean() * 100  # PSQI >1 considered poor sleep in your coding
+    high_anxiety_pct = (df['Trait_Anxiety'] > 40).mean() * 100  # threshold example
 
 # Create 4 columns for metrics
 col1, col2, col3, col4 = st.columns(4)
@@ -52,61 +82,8 @@ col4.metric(
 
 st.title("1.1. Histogram of Sleep Quality Scores")
 
-# Calculate mean and median
-mean_psqi = df['psqi_2_groups'].mean()
-median_psqi = df['psqi_2_groups'].median()
-
-# Create Plotly distplot
-fig = ff.create_distplot(
-    [df['psqi_2_groups'].dropna()],
-    group_labels=['Distribution of Sleep Quality'],
-    show_hist=True,
-    show_rug=False
-)
-
-# Add mean and median lines
-fig.add_shape(
-    type="line",
-    x0=mean_psqi, y0=0,
-    x1=mean_psqi, y1=1,
-    line=dict(color="red", width=2, dash="dash"),
-    xref='x', yref='paper'
-)
-fig.add_annotation(
-    x=mean_psqi, y=1,
-    xref='x', yref='paper',
-    text=f"Mean: {mean_psqi:.2f}",
-    showarrow=False, yshift=10,
-    font=dict(color="red")
-)
-
-fig.add_shape(
-    type="line",
-    x0=median_psqi, y0=0,
-    x1=median_psqi, y1=1,
-    line=dict(color="green", width=2, dash="dash"),
-    xref='x', yref='paper'
-)
-fig.add_annotation(
-    x=median_psqi, y=1,
-    xref='x', yref='paper',
-    text=f"Median: {median_psqi:.2f}",
-    showarrow=False, yshift=-10,
-    font=dict(color="green")
-)
-
-# Layout updates
-fig.update_layout(
-    title_text=" - Distribution of Sleep Quality (PSQI) with Mean and Median",
-    xaxis_title="PSQI Score (Higher = Poorer Sleep)",
-    yaxis_title="Density",
-    template="plotly_white",
-    width=800,
-    height=500
-)
-
-# Display the figure inside Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# Distribution with mean and median lines (built in figures.py)
+page.slot("1.1", show_chart)
 
 # --- Simple interpretation (Streamlit text output) ---
 st.subheader("Interpretation")
@@ -119,19 +96,8 @@ about half reported fairly or very bad sleep.
 # --- 2. Sleep Quality Distribution (Histogram) ---
 st.title("1.2. Boxplot of Trait Anxiety by Year of Study")
 
-# Create Plotly boxplot
-fig = px.box(
-    df,
-    x='Year_of_Study',
-    y='Trait_Anxiety',
-    points='all',  # Show all points
-    title=' - Trait Anxiety by Year of Study',
-    labels={'Year_of_Study': 'Year of Study', 'Trait_Anxiety': 'Trait Anxiety Score'},
-    color='Year_of_Study'  # Optional: color by year for better distinction
-)
-
-# Display in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# Boxplot markers are capped at the point budget, see sampling.py
+page.slot("1.2", show_year_boxplot)
 
 # --- Interpretation ---
 st.subheader("Interpretation")
@@ -143,31 +109,8 @@ st.write("""
 # --- 3. Sleep Quality by Year of Study (Box Plot) ---
 st.title("1.3. Grouped Bar Chart of Categorical Sleep Quality by Gender")
 
-# Categorize psqi_2_groups into descriptive categories
-def categorize_psqi(score):
-    if score == 1:
-        return 'Good Sleep'
-    elif score == 2:
-        return 'Poor Sleep'
-    else:
-        return 'Other'  # Handle unexpected values
-
-df['Sleep_Quality_Category_Detailed'] = df['psqi_2_groups'].apply(categorize_psqi)
-
-# Create grouped bar chart
-fig = px.bar(
-    df,
-    x='Sex',
-    color='Sleep_Quality_Category_Detailed',
-    barmode='group',
-    title=' - Sleep Quality Category Distribution by Sex',
-    labels={'Sex': 'Sex', 'Sleep_Quality_Category_Detailed': 'Sleep Quality Category'}
-    )
-
-fig.update_layout(yaxis_title="Number of Students")
-    
-# Display in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# 'Sleep_Quality_Category_Detailed' is derived once at load time (see features.py)
+page.slot("1.3", show_chart)
 
 # Add interpretation
 st.subheader("Interpretation")
@@ -175,3 +118,6 @@ st.markdown("""
 1. This grouped bar chart compares how sleep quality levels differ between male and female students.  
 2. It shows which gender reports better or poorer sleep more often, helping us see if one group tends to struggle more with sleep quality.
 """)
+
+page.fill()
+debug_panel()
@@ -1,18 +1,37 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-import plotly.express as px
-import statsmodels.api as sm
+
+from bootstrap import correlation_cis
+from figures import CONTINUOUS_COLS, cached_figure
+from filters import sidebar_filters
+from group_stats import overall_summary
+from instrument import debug_panel, section
+from progressive import ProgressivePage
+from registry import select_dataset
+from sampling import sample_points
+from stats_engine import pearson
 
 
 st.title("Objectives 2 - Explore the Relationship Sleep Quality, Anxiety Levels and Daytime Dozing")
 
-# Load dataset
-url = "https://raw.githubusercontent.com/nadiashahzanani/Sleep-Anxiety-Visualization/refs/heads/main/Time_to_think_Norburyy.csv"
-df = pd.read_csv(url)
+# Load dataset and apply sidebar cohort filters
+with section("load"):
+    df = sidebar_filters(select_dataset())
+
+# --- Start every chart section on the shared pool; each is drawn as it finishes ---
+continuous_cols = [col for col in CONTINUOUS_COLS if col in df.columns]
+page = ProgressivePage()
+page.submit("2.1", lambda: (cached_figure("obj2.2.1", df), sample_points(df, 'Chronotype', 'Trait_Anxiety')[1]))
+if continuous_cols:
+    page.submit("2.2", lambda: cached_figure("obj2.2.2", df))
+page.submit("2.3", lambda: (cached_figure("obj2.2.3", df), sample_points(df, 'Chronotype', 'Trait_Anxiety')[1]))
+
+
+def show_chart(result):
+    fig, points_note = result
+    st.plotly_chart(fig, use_container_width=True)
+    if points_note:
+        st.caption(points_note)
+
 
 # Set the title for the Streamlit app
 st.subheader("Student Sleep Quality, Anxiety Overview")
@@ -22,57 +41,32 @@ sleep_col = 'psqi_2_groups'     # Sleep quality
 anxiety_col = 'Trait_Anxiety'   # Trait anxiety
 meq_col = 'MEQ'                  # Morningness-Eveningness Questionnaire
 
-# --- Calculate metrics ---
-mean_sleep = df[sleep_col].mean()
-mean_anxiety = df[anxiety_col].mean()
-corr, p_val = stats.pearsonr(df[sleep_col].dropna(), df[anxiety_col].dropna())
-max_sleep = df[sleep_col].max()
-max_anxiety = df[anxiety_col].max()
+# --- Calculate metrics (cached summary store and stats engine) ---
+with section("metrics"):
+    summary = overall_summary(df, [sleep_col, anxiety_col])
+    mean_sleep = summary.loc[sleep_col, 'mean']
+    mean_anxiety = summary.loc[anxiety_col, 'mean']
+    corr, p_val = pearson(df, sleep_col, anxiety_col)
+    corr_ci = correlation_cis(df, sleep_col, anxiety_col)['r']
+    max_sleep = summary.loc[sleep_col, 'max']
+    max_anxiety = summary.loc[anxiety_col, 'max']
 
 # --- Display metrics ---
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Average Sleep Quality", f"{mean_sleep:.2f}", delta=f"Max: {max_sleep}", help="Higher = poorer sleep")
-col2.metric("Average Trait Anxiety", f"{mean_anxiety:.2f}", delta=f"Max: {max_anxiety}", help="STAI Trait Anxiety")
+col1.metric("Average Sleep Quality", f"{mean_sleep:.2f}", delta=f"Max: {max_sleep:g}", help="Higher = poorer sleep")
+col2.metric("Average Trait Anxiety", f"{mean_anxiety:.2f}", delta=f"Max: {max_anxiety:g}", help="STAI Trait Anxiety")
 col3.metric("Sleep-Anxiety Correlation", f"{corr:.2f}", delta=f"p = {p_val:.3g}", help="Positive = poor sleep linked to higher anxiety")
+col3.caption(f"95% bootstrap CI [{corr_ci['low']:.2f}, {corr_ci['high']:.2f}]")
 col4.metric(
     label="Sample Size",
     value=f"{len(df)}",
     help="Number of students"
 )
 
-# --- Ensure 'Chronotype' column exists ---
-if 'Chronotype' not in df.columns:
-    # Example thresholds for MEQ scores
-    def categorize_meq(score):
-        if score >= 60:
-            return 'Morning Type'
-        elif score >= 40:
-            return 'Intermediate Type'
-        else:
-            return 'Evening Type'
-    df['Chronotype'] = df['MEQ'].apply(categorize_meq)
-
-# --- Fit OLS regression ---
-X = sm.add_constant(df['psqi_2_groups'])
-y = df['Trait_Anxiety']
-model = sm.OLS(y, X).fit()
-r_squared = model.rsquared
-p_value = model.pvalues[1]  # p-value for 'psqi_2_groups'
-
-# --- Create Plotly scatter plot with regression line ---
+# --- Scatter plot with OLS regression lines (built in figures.py) ---
 st.title("2.1. Scatter Plot of Sleep Quality vs Trait Anxiety with Regression Line")
-fig = px.scatter(
-    df,
-    x='psqi_2_groups',
-    y='Trait_Anxiety',
-    color='Chronotype',
-    trendline="ols",  # adds regression line automatically
-    title=f" - Sleep Quality vs Trait Anxiety (R² = {r_squared:.2f}, p = {p_value:.4f})",
-    labels={'psqi_2_groups': 'PSQI (Sleep Quality)', 'Trait_Anxiety': 'Trait Anxiety'}
-)
-
-# --- Display the Plotly chart in Streamlit ---
-st.plotly_chart(fig, use_container_width=True)
+# Markers are capped at the point budget; the regression lines use every row
+page.slot("2.1", show_chart)
 
 # --- Optional Interpretation ---
 st.subheader("Interpretation")
@@ -85,31 +79,10 @@ st.markdown("""
 
 st.title("2.2. Correlation matrix heatmap (continuous measures)")
 
-# Select continuous columns for correlation
-continuous_cols = ['psqi_2_groups', 'Trait_Anxiety', 'Avg_Weekly_Sleep_Duration',
-                       'Avg_Sleep_Working_days', 'Avg_sleep_free_days', 'Daytime_Dozing', 'Age', 'MEQ', 'Sleep_category']
-
-# Ensure selected columns exist in the DataFrame
-continuous_cols = [col for col in continuous_cols if col in df.columns]
-
+# Correlations over the continuous columns present in the DataFrame
 if continuous_cols:
-    # Calculate the Pearson correlation matrix
-    corr_matrix = df[continuous_cols].corr(method='pearson')
-    
-    # Create an interactive heatmap with Plotly
-    fig = px.imshow(corr_matrix,
-                    text_auto=True,          # Annotate with correlation values
-                    aspect="auto",
-                    title=' - Correlation Matrix Heatmap of Key Variables',
-                    labels=dict(color="Correlation"))
-
-    fig.update_layout(xaxis_showgrid=False,
-                    yaxis_showgrid=False,
-                    xaxis_nticks=len(continuous_cols),
-                    yaxis_nticks=len(continuous_cols))
-
-    # Display the heatmap in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    # Display the Pearson correlation heatmap in Streamlit
+    page.slot("2.2", lambda fig: st.plotly_chart(fig, use_container_width=True))
 
     # Interpretation box
     st.subheader("Interpretation")
@@ -123,31 +96,8 @@ if continuous_cols:
 # --- Create the interactive violin plot ---
 st.title("2.3. Chronotype (rMEQ Score) by Sleep Quality Category (Interactive)")
 
-# Ensure 'Chronotype' column exists
-if 'Chronotype' not in df.columns:
-    # Categorize MEQ scores into Chronotypes (adjust thresholds as needed)
-    def categorize_meq(score):
-        if score >= 60:
-            return 'Morning Type'
-        elif score >= 40:
-            return 'Intermediate Type'
-        else:
-            return 'Evening Type'
-    df['Chronotype'] = df['MEQ'].apply(categorize_meq)
-
-# Create Plotly scatter plot with facet by Chronotype
-fig = px.scatter(
-    df,
-    x='psqi_2_groups',
-    y='Trait_Anxiety',
-    facet_col='Chronotype',
-    trendline="ols",  # Add regression line
-    title=' - Sleep Quality vs Trait Anxiety by Chronotype',
-    labels={'psqi_2_groups': 'PSQI (Sleep Quality)', 'Trait_Anxiety': 'Trait Anxiety'}
-)
-
-# Display Plotly figure in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# Scatter plot faceted by Chronotype, one regression line per facet
+page.slot("2.3", show_chart)
 
 # Interpretation section
 st.subheader("Interpretation")
@@ -156,3 +106,6 @@ st.markdown("""
 2. If the slopes of the regression lines differ, it suggests that chronotype affects how strongly sleep quality links to anxiety.  
 If the slopes are similar, the relationship is consistent across all chronotypes.
 """)
+
+page.fill()
+debug_panel()
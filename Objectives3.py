@@ -1,37 +1,43 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
+
+from figures import cached_figure
+from filters import sidebar_filters
+from group_stats import overall_summary
+from instrument import debug_panel, section
+from progressive import ProgressivePage
+from registry import select_dataset
+from sampling import sample_points
 
 st.title("Objectives 3 - Start-Time Preferences, Chronotype and Sleep Quality in Policy Implications")
 
-# Load dataset
-url = "https://raw.githubusercontent.com/nadiashahzanani/Sleep-Anxiety-Visualization/refs/heads/main/Time_to_think_Norburyy.csv"
-df = pd.read_csv(url)
-
-# Ensure 'Chronotype' column exists
-if 'Chronotype' not in df.columns:
-    # Categorize MEQ scores into Chronotypes
-    def categorize_meq(score):
-        if score >= 60:
-            return 'Morning Type'
-        elif score >= 40:
-            return 'Intermediate Type'
-        else:
-            return 'Evening Type'
-    
-    df['Chronotype'] = df['MEQ'].apply(categorize_meq)
+# Load dataset and apply sidebar cohort filters
+with section("load"):
+    df = sidebar_filters(select_dataset())
+
+# --- Start every chart section on the shared pool; each is drawn as it finishes ---
+page = ProgressivePage()
+page.submit("3.1", lambda: (cached_figure("obj3.3.1", df), sample_points(df, 'Chronotype', 'Start_time_code')[1]))
+page.submit("3.2", lambda: cached_figure("obj3.3.2", df))
+page.submit("3.3", lambda: cached_figure("obj3.3.3", df))
+
 
-# Now calculate chronotype counts safely
-chronotype_counts = df['Chronotype'].value_counts()
+def show_chart(fig):
+    st.plotly_chart(fig, use_container_width=True)
 
-# --- Calculate summary metrics for Objective 3 ---
-mean_pref_start = df['Start_time_code'].mean()
-mean_sleep_quality = df['psqi_2_groups'].mean()
-chronotype_counts = df['Chronotype'].value_counts() if 'Chronotype' in df.columns else df['MEQ'].apply(categorize_meq).value_counts()
-earliest_start = df['Start_time_code'].min()
-latest_start = df['Start_time_code'].max()
+
+def show_chart_with_note(result):
+    fig, points_note = result
+    show_chart(fig)
+    if points_note:
+        st.caption(points_note)
+
+# --- Calculate summary metrics for Objective 3 (cached summary store) ---
+with section("metrics"):
+    summary = overall_summary(df, ['Start_time_code', 'psqi_2_groups'])
+    mean_pref_start = summary.loc['Start_time_code', 'mean']
+    mean_sleep_quality = summary.loc['psqi_2_groups', 'mean']
+    earliest_start = summary.loc['Start_time_code', 'min']
+    latest_start = summary.loc['Start_time_code', 'max']
 
 
 # Set the title for the Streamlit app
@@ -50,19 +56,8 @@ col4.metric(label="Latest Preferred Start", value=f"{latest_start:.2f} h",
 
 st.title("3.1. Distribution of Prefereed Class Start Time Across Chronotypes")
 
-# Create interactive violin plot with Plotly
-fig = px.violin(
-    df,
-    x='Chronotype',
-    y='Start_time_code',  # Replace with your column for preferred start time
-    box=True,  # adds boxplot inside violin
-    points='all',  # show all individual data points
-    title='- Preferred Start Time by Chronotype',
-    labels={'Chronotype': 'Chronotype', 'Start_time_code': 'Preferred Start Time'}
-)
-
-# Display plot in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# Interactive violin plot; markers are capped at the point budget (see sampling.py)
+page.slot("3.1", show_chart_with_note)
 
 # Add interpretation
 st.subheader("Interpretation")
@@ -74,21 +69,8 @@ st.markdown("""
 
 st.title("3.2. How Sleep Quality Varies With Preferred Start Times")
 
-# Create the Plotly density heatmap
-fig = px.density_heatmap(
-    df,
-    x='Start_time_code',
-    y='psqi_2_groups',
-    title=' - Preferred Start Time vs Sleep Quality',
-    labels={
-        'Start_time_code': 'Preferred Start Time Code',
-        'psqi_2_groups': 'PSQI (Sleep Quality)'
-    },
-    color_continuous_scale='Blues'
-)
-
-# Display the figure in Streamlit
-st.plotly_chart(fig, use_container_width=True)
+# Density heatmap of (start time, PSQI) counts
+page.slot("3.2", show_chart)
 
 # Interpretation
 st.subheader("Interpretation")
@@ -99,33 +81,7 @@ st.markdown("""
 
 st.title("3.3. Average Gap Between Preferred and Actual Start Times by Year (With Sleep Quality)")
     
-# --- Calculate mean preferred start time and mean sleep quality by Year of Study ---
-mean_start_time_quality = df.groupby('Year_of_Study').agg(
-    Mean_Start_Time_Code=('Start_time_code', 'mean'),
-    Mean_Sleep_Quality=('psqi_2_groups', 'mean')
-).reset_index()
-
-# --- Create Plotly bar chart ---
-fig = px.bar(
-    mean_start_time_quality,
-    x='Year_of_Study',
-    y='Mean_Start_Time_Code',
-    title=' - Mean Preferred Start Time by Year of Study',
-    labels={'Year_of_Study': 'Year of Study', 'Mean_Start_Time_Code': 'Mean Preferred Start Time Code'},
-    text='Mean_Start_Time_Code',  # optional: show bar values
-    color='Mean_Start_Time_Code',  # optional: color by height
-    color_continuous_scale='Blues'
-)
-
-# Add annotations for mean sleep quality
-for index, row in mean_start_time_quality.iterrows():
-    fig.add_annotation(
-        x=row['Year_of_Study'],
-        y=row['Mean_Start_Time_Code'],
-        text=f"Sleep Quality: {row['Mean_Sleep_Quality']:.2f}",
-        showarrow=False,
-        yshift=10
-    )
+# --- Mean preferred start time by Year of Study, annotated with mean sleep quality ---
 
 # --- Interpretation ---
 st.subheader("Interpretation")
@@ -134,4 +90,7 @@ st.markdown("""
     and how their average sleep quality compares. 
 2. Years that prefer later starts but report poorer sleep may benefit from adjusted schedules.
 """)
-st.plotly_chart(fig, use_container_width=True)
+page.slot("3.3", show_chart)
+
+page.fill()
+debug_panel()
@@ -0,0 +1,74 @@
+# ===================================================
+# Server-side aggregation for count-style charts
+# ===================================================
+#
+# px.histogram / px.density_heatmap / px.bar on raw rows ship every row to
+# the browser and let plotly.js do the counting. These helpers count in
+# NumPy/pandas instead, so figures only carry one value per bin or cell.
+# Crosstabs over unfiltered, file-backed data run in the query backend.
+
+import numpy as np
+import pandas as pd
+
+import query_backend
+from cache import LRUCache, frame_token
+
+_results = LRUCache(maxsize=128)
+
+# Integer columns with at most this many distinct values get one bin per value
+DISCRETE_MAX_LEVELS = 50
+
+
+def _edges(values, nbins):
+    values = values[~np.isnan(values)]
+    if nbins is None:
+        levels = np.unique(values)
+        if len(levels) <= DISCRETE_MAX_LEVELS and np.all(levels == np.round(levels)):
+            return np.arange(levels.min() - 0.5, levels.max() + 1.5) if len(levels) else np.array([0.0, 1.0])
+        nbins = 20
+    return np.histogram_bin_edges(values, bins=nbins)
+
+
+def histogram(df, column, nbins=None):
+    """Bin counts of `column`: one row per bin with left/right edges, centre and count."""
+    def compute():
+        values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+        edges = _edges(values, nbins)
+        counts, edges = np.histogram(values[~np.isnan(values)], bins=edges)
+        return pd.DataFrame({
+            "left": edges[:-1],
+            "right": edges[1:],
+            "center": (edges[:-1] + edges[1:]) / 2,
+            "width": np.diff(edges),
+            "count": counts,
+        })
+
+    return _results.get_or_compute(("hist", frame_token(df), column, nbins), compute)
+
+
+def histogram2d(df, x, y, nbinsx=None, nbinsy=None):
+    """2-D bin counts of (`x`, `y`): returns (x_centres, y_centres, counts[y, x])."""
+    def compute():
+        pairs = df[[x, y]].dropna().to_numpy(dtype="float64")
+        x_edges = _edges(pairs[:, 0], nbinsx)
+        y_edges = _edges(pairs[:, 1], nbinsy)
+        counts, x_edges, y_edges = np.histogram2d(pairs[:, 0], pairs[:, 1], bins=[x_edges, y_edges])
+        return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+    return _results.get_or_compute(("hist2d", frame_token(df), x, y, nbinsx, nbinsy), compute)
+
+
+def crosstab(df, rows, cols, name="Count"):
+    """Long-format counts of every observed (`rows`, `cols`) combination."""
+    def compute():
+        source = query_backend.source_for(df, [rows, cols])
+        if source is not None:
+            return query_backend.crosstab(source, rows, cols, name)
+        return (
+            df.groupby([rows, cols], observed=True)
+            .size()
+            .rename(name)
+            .reset_index()
+        )
+
+    return _results.get_or_compute(("crosstab", frame_token(df), rows, cols, name), compute)
@@ -0,0 +1,214 @@
+# ===================================================
+# Headless render benchmark for the dashboard pages
+# ===================================================
+#
+#   python benchmark.py                           # 1k, 100k and 1M rows, all pages
+#   python benchmark.py --rows 10000000 --pages Objectives2.py
+#   python benchmark.py --compare benchmarks/<old>.json benchmarks/<new>.json
+#
+# Each page runs through Streamlit's AppTest in a fresh interpreter with
+# SLEEP_ANXIETY_DATA pointing at a dataset of the requested size, so import,
+# load, compute and figure-building costs are all included. Every run records
+# wall time of the cold first render and of a warm rerun, the peak RSS of the
+# worker process and the serialized size of each figure. The worker runs with
+# SLEEP_ANXIETY_PROFILE=1, so the per-section records of instrument.py (wall
+# and CPU time, allocation peak, peak-RSS growth, figure bytes) are stored for
+# both renders as well (allocation tracing slows the cold render somewhat,
+# so compare result files from the same harness). A page that times out or
+# fails is recorded as an error entry. Results go to benchmarks/<commit>.json
+# so regressions can be diffed across commits.
+#
+# Scaled datasets come from the copula generator in synthetic.py and are
+# written once per (rows, seed) to .cache/benchmark/ as Parquet.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+PAGES = ["Homepage.py", "Objectives1.py", "Objectives2.py", "Objectives3.py"]
+SIZES = [1_000, 100_000, 1_000_000]
+RESULTS_DIR = ROOT / "benchmarks"
+DATA_DIR = ROOT / ".cache" / "benchmark"
+TIMEOUT = 1800  # seconds per page run
+
+
+# ---------------------------------------------------
+# Scaled datasets
+# ---------------------------------------------------
+def scaled_dataset(rows, seed=0):
+    """Path of a Parquet file with `rows` synthetic rows (see synthetic.py)."""
+    from synthetic import generate
+
+    target = DATA_DIR / f"synthetic-{rows}-{seed}.parquet"
+    if not target.exists():
+        generate(target, rows, seed)
+    return target
+
+
+# ---------------------------------------------------
+# Worker: one page, one dataset, one fresh process
+# ---------------------------------------------------
+def _charts(at):
+    charts = []
+    for chart in at.get("plotly_chart"):
+        spec = chart.proto.spec
+        title = json.loads(spec).get("layout", {}).get("title", {})
+        charts.append({
+            "title": title.get("text", "") if isinstance(title, dict) else str(title),
+            "bytes": len(spec.encode("utf-8")),
+        })
+    return charts
+
+
+class _SectionRecords(logging.Handler):
+    """Collects the JSON records instrument.py logs for each section."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+    def take(self):
+        records, self.records = self.records, []
+        return records
+
+
+def run_page(page):
+    """Render `page` cold and warm in this process; return the measurements."""
+    from streamlit.testing.v1 import AppTest
+
+    from instrument import logger
+
+    sections = _SectionRecords()
+    logger.addHandler(sections)
+    at = AppTest.from_file(str(ROOT / page), default_timeout=TIMEOUT)
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+    cold_sections = sections.take()
+    start = time.perf_counter()
+    at.run()
+    warm = time.perf_counter() - start
+    warm_sections = sections.take()
+
+    charts = _charts(at)
+    return {
+        "cold_s": round(cold, 4),
+        "warm_s": round(warm, 4),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1),
+        "exceptions": [str(e.value) for e in at.exception],
+        "figure_bytes": sum(c["bytes"] for c in charts),
+        "charts": charts,
+        "sections": {"cold": cold_sections, "warm": warm_sections},
+    }
+
+
+def measure(page, data_path):
+    """Run `run_page` in a fresh interpreter reading `data_path`."""
+    env = {**os.environ, "SLEEP_ANXIETY_DATA": str(data_path), "SLEEP_ANXIETY_PROFILE": "1"}
+    env.pop("SLEEP_ANXIETY_PROFILE_LOG", None)  # records are collected in the worker
+    try:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", page],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": [f"timed out after {TIMEOUT} s"]}
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["worker failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------------------------------------------
+# Reports
+# ---------------------------------------------------
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return out + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def benchmark(pages=PAGES, sizes=SIZES, seed=0):
+    results = []
+    for rows in sizes:
+        data_path = scaled_dataset(rows, seed)
+        for page in pages:
+            result = {"page": page, "rows": rows, **measure(page, data_path)}
+            results.append(result)
+            if "error" in result:
+                print(f"{page:16s} {rows:>11,} rows  ERROR {result['error']}")
+            else:
+                print(f"{page:16s} {rows:>11,} rows  cold {result['cold_s']:8.2f} s  "
+                      f"warm {result['warm_s']:7.2f} s  rss {result['peak_rss_mb']:8.1f} MB  "
+                      f"figures {result['figure_bytes'] / 1024:8.1f} KiB")
+    return {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(old_path, new_path):
+    """Print new/old ratios for every (page, rows) present in both result files."""
+    old, new = (json.loads(Path(p).read_text(encoding="utf-8")) for p in (old_path, new_path))
+    before = {(r["page"], r["rows"]): r for r in old["results"] if "error" not in r}
+    print(f"{old['commit']} -> {new['commit']}")
+    for r in new["results"]:
+        o = before.get((r["page"], r["rows"]))
+        if o is None or "error" in r:
+            continue
+        ratios = "  ".join(
+            f"{key} x{r[key] / o[key]:.2f}" if o[key] else f"{key} n/a"
+            for key in ("cold_s", "warm_s", "peak_rss_mb", "figure_bytes")
+        )
+        print(f"{r['page']:16s} {r['rows']:>11,} rows  {ratios}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless page renders on scaled datasets.")
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--rows", nargs="+", type=int, default=SIZES, help="dataset sizes to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_page(args.worker)))
+        return 0
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    report = benchmark(args.pages, args.rows, args.seed)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# ===================================================
+# Bootstrap confidence intervals with vectorized resampling
+# ===================================================
+#
+# The survey columns are integer-coded, so a frame of n rows collapses to a
+# few unique (x, y) or (group, value) cells with counts. A bootstrap resample
+# is then a multinomial draw of n rows over those cells, and every statistic
+# follows from count-weighted sums: O(B * cells) work, independent of n.
+# Resamples are drawn in blocks sized to bound memory, seeded from one
+# SeedSequence (so results do not depend on the number of workers) and
+# spread over a process pool when B * cells is large. Results are cached per
+# dataset version and filter.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_token
+
+N_BOOT = 2000
+LEVEL = 0.95
+BLOCK_ELEMENTS = 4_000_000        # resampled cell counts per block (~32 MB of int64)
+PARALLEL_MIN_WORK = 200_000_000   # use a process pool from this many B * cells up
+
+_intervals = LRUCache(maxsize=128, persist="bootstrap")
+
+
+def _cells(rows):
+    """Unique rows of `rows` (a frame) as float columns, plus how often each occurs."""
+    counts = rows.value_counts(sort=False)
+    columns = [counts.index.get_level_values(i).to_numpy(dtype="float64") for i in range(rows.shape[1])]
+    return columns, counts.to_numpy(dtype="int64")
+
+
+def _pearson_block(x, y, weights):
+    # x, y are centred cell values; weights is (B, cells) row counts
+    n = weights.sum(axis=1)
+    sx, sy = weights @ x, weights @ y
+    sxy = weights @ (x * y) - sx * sy / n
+    sxx = weights @ (x * x) - sx * sx / n
+    syy = weights @ (y * y) - sy * sy / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = sxy / np.sqrt(sxx * syy)
+        slope = sxy / sxx
+    return np.column_stack([r, slope, r * r])
+
+
+def _mean_difference_block(y, onehot, weights):
+    # onehot is (cells, groups): the group of each (group, value) cell
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (weights @ (onehot * y[:, None])) / (weights @ onehot)
+    return means[:, 1:] - means[:, :1]
+
+
+def _run_block(kind, arrays, size, seed):
+    rng = np.random.default_rng(seed)
+    counts = arrays[0]
+    weights = rng.multinomial(counts.sum(), counts / counts.sum(), size=size).astype("float64")
+    if kind == "pearson":
+        return _pearson_block(arrays[1], arrays[2], weights)
+    return _mean_difference_block(arrays[1], arrays[2], weights)
+
+
+def bootstrap(kind, arrays, n_boot=N_BOOT, seed=0, workers=None):
+    """Statistics for `n_boot` resamples, shape (n_boot, n_statistics).
+
+    `arrays[0]` holds the row count of each cell.
+    """
+    cells = len(arrays[0])
+    block = max(1, BLOCK_ELEMENTS // max(cells, 1))
+    sizes = [min(block, n_boot - start) for start in range(0, n_boot, block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if n_boot * cells >= PARALLEL_MIN_WORK and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            blocks = list(pool.map(_run_block, [kind] * len(sizes), [arrays] * len(sizes), sizes, seeds))
+    else:
+        blocks = [_run_block(kind, arrays, size, s) for size, s in zip(sizes, seeds)]
+    return np.vstack(blocks)
+
+
+def _interval(samples, estimate, level):
+    tail = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(samples, [tail, 100 - tail])
+    return {"estimate": float(estimate), "low": float(low), "high": float(high)}
+
+
+def correlation_cis(df, x, y, n_boot=N_BOOT, level=LEVEL, seed=0):
+    """Percentile CIs for Pearson r, the OLS slope of y on x and R²."""
+    def compute():
+        (xs, ys), counts = _cells(df[[x, y]].dropna())
+        if len(counts) == 0:
+            nan = {"estimate": np.nan, "low": np.nan, "high": np.nan}
+            return {name: dict(nan) for name in ["r", "slope", "r_squared"]}
+        # Centre once so the weighted sums stay well conditioned
+        xs = xs - np.average(xs, weights=counts)
+        ys = ys - np.average(ys, weights=counts)
+        full = _pearson_block(xs, ys, counts[None, :].astype("float64"))[0]
+        samples = bootstrap("pearson", (counts, xs, ys), n_boot, seed)
+        return {
+            name: _interval(samples[:, i], full[i], level)
+            for i, name in enumerate(["r", "slope", "r_squared"])
+        }
+
+    return _intervals.get_or_compute(("corr_ci", frame_token(df), x, y, n_boot, level, seed), compute)
+
+
+def mean_difference_cis(df, value, group, n_boot=N_BOOT, level=LEVEL, seed=0):
+    """CIs for mean(value) of each group minus the first (reference) group.
+
+    Returns a frame indexed by group with reference, estimate, low and high.
+    """
+    def compute():
+        rows = df[[value, group]].dropna()
+        codes, levels = pd.factorize(rows[group], sort=True)
+        if len(levels) < 2:
+            return pd.DataFrame(columns=["reference", "estimate", "low", "high"])
+        (ys, cell_codes), counts = _cells(pd.DataFrame({"value": rows[value].to_numpy(), "code": codes}))
+        onehot = np.eye(len(levels))[cell_codes.astype("int64")]
+        full = _mean_difference_block(ys, onehot, counts[None, :].astype("float64"))[0]
+        samples = bootstrap("mean_difference", (counts, ys, onehot), n_boot, seed)
+        return pd.DataFrame(
+            [{"reference": levels[0], **_interval(samples[:, j], full[j], level)} for j in range(len(levels) - 1)],
+            index=pd.Index(levels[1:], name=group),
+        )
+
+    return _intervals.get_or_compute(("diff_ci", frame_token(df), value, group, n_boot, level, seed), compute)
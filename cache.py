@@ -0,0 +1,246 @@
+# ===================================================
+# Small in-process caches shared by the data and stats modules
+# ===================================================
+#
+# Caches created with `persist="<namespace>"` also read through to the
+# on-disk artifact store filled by precompute.py, so the first request after
+# a deploy is a file read instead of a computation. Only the precompute job
+# writes to the store (`ARTIFACTS.writable`); the app just reads it.
+#
+# Stored artifacts are only valid for the code that built them, so each
+# version directory is also named after a fingerprint of the package's Python
+# sources (plus `ARTIFACT_SCHEMA`, bumped when the pickled layouts change),
+# and the app only reads a directory whose manifest.json, written by the job
+# once it finished, matches both.
+#
+# Every key embeds the dataset's content hash, so a changed file can never
+# hit an old entry; `evict_version()` additionally drops the old version's
+# entries from every cache as soon as a newer version replaces it.
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+ARTIFACT_DIR = Path(__file__).with_name(".cache") / "artifacts"
+ARTIFACT_SCHEMA = 2
+MANIFEST = "manifest.json"
+
+_fingerprint = None
+
+
+def _token_in(key):
+    # Cache keys embed `frame_token(df)`, a (version, filter key) pair of strings
+    for part in key:
+        if isinstance(part, tuple) and len(part) == 2 and all(isinstance(p, str) for p in part):
+            return part
+    return None
+
+
+def code_fingerprint():
+    """Hash of every module next to this one and of `ARTIFACT_SCHEMA`."""
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256(f"schema {ARTIFACT_SCHEMA}".encode())
+        for source in sorted(Path(__file__).parent.glob("*.py")):
+            digest.update(source.name.encode())
+            digest.update(source.read_bytes())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+def version_dir(version):
+    """Directory name for a dataset version (and the current code) in the artifact store."""
+    if not (len(version) == 64 and all(c in "0123456789abcdef" for c in version)):
+        version = hashlib.sha256(version.encode("utf-8")).hexdigest()
+    return f"{version[:16]}-{code_fingerprint()[:12]}"
+
+
+class ArtifactStore:
+    """Pickled cache values under <root>/<version>-<code>/<namespace>/<key hash>.pkl."""
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = Path(root)
+        self.writable = False
+        self._checked = {}  # version directory -> manifest matched
+
+    def _manifest_ok(self, directory):
+        ok = self._checked.get(directory.name)
+        if ok is None:
+            try:
+                manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return False  # not (completely) precomputed yet; check again later
+            ok = (manifest.get("code") == code_fingerprint()
+                  and manifest.get("schema") == ARTIFACT_SCHEMA
+                  and version_dir(manifest.get("version", "")) == directory.name)
+            self._checked[directory.name] = ok
+        return ok
+
+    def write_manifest(self, version, **info):
+        """Mark the artifacts of `version` as complete for the current code."""
+        directory = self.root / version_dir(version)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"version": version, "code": code_fingerprint(), "schema": ARTIFACT_SCHEMA}
+        try:  # keep what other jobs (precompute.py, ingest.py) recorded for this code
+            previous = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+            if previous.get("code") == manifest["code"]:
+                manifest = {**previous, **manifest}
+        except (OSError, ValueError):
+            pass
+        manifest.update(info)
+        tmp = directory / f"{MANIFEST}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        tmp.replace(directory / MANIFEST)
+
+    def path(self, namespace, key):
+        token = _token_in(key)
+        if token is None:
+            return None
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        return self.root / version_dir(token[0]) / namespace / f"{digest}.pkl"
+
+    def load(self, namespace, key, default=None):
+        path = self.path(namespace, key)
+        if path is None or not path.exists() or not self._manifest_ok(path.parent.parent):
+            return default
+        try:
+            with open(path, "rb") as fh:
+                return pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def save(self, namespace, key, value):
+        path = self.path(namespace, key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    def prune(self, keep_versions):
+        """Delete the stored artifacts of every version not in `keep_versions`,
+        and of every version built by other code."""
+        keep = {version_dir(v) for v in keep_versions}
+        removed = []
+        if self.root.exists():
+            for entry in self.root.iterdir():
+                if entry.is_dir() and entry.name not in keep:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed.append(entry.name)
+        return removed
+
+
+ARTIFACTS = ArtifactStore()
+
+_caches = weakref.WeakSet()  # every LRUCache, for evict_version()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping.
+
+    Bounded by entry count and, when `maxbytes` is given, by the total
+    `sizeof(value)` of the stored values.
+    """
+
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=None, persist=None):
+        self.maxsize = maxsize
+        self.persist = persist  # artifact-store namespace, if any
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> lock held while that key is being computed
+        _caches.add(self)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self.sizeof(self._data.pop(key))
+            self._data[key] = value
+            self.nbytes += self.sizeof(value)
+            while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes and len(self._data) > 1
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self.nbytes -= self.sizeof(evicted)
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        # One computation per key: concurrent callers (e.g. progressive.py
+        # sections) wait for the first one instead of repeating the work
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self.get(key, missing)
+                if value is missing and self.persist is not None:
+                    value = ARTIFACTS.load(self.persist, key, missing)
+                    if value is not missing:
+                        self.set(key, value)
+                if value is missing:
+                    value = compute()
+                    if self.persist is not None and ARTIFACTS.writable:
+                        ARTIFACTS.save(self.persist, key, value)
+                    self.set(key, value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return value
+
+    def discard(self, predicate):
+        """Remove every entry whose key satisfies `predicate`; returns how many."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                self.nbytes -= self.sizeof(self._data.pop(key))
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def evict_version(version):
+    """Drop every in-memory cache entry computed from dataset `version`."""
+    def stale(key):
+        token = _token_in(key) if isinstance(key, tuple) else None
+        return token is not None and token[0] == version
+
+    return sum(cache.discard(stale) for cache in list(_caches))
+
+
+def frame_token(df):
+    """Identify the rows a frame holds: (dataset version, filter key).
+
+    Frames returned by `load_dataset()` carry their version in `df.attrs`;
+    anything else falls back to hashing the content.
+    """
+    version = df.attrs.get("dataset_version")
+    if version is None:
+        version = "hash:%x" % int(pd.util.hash_pandas_object(df, index=True).sum())
+    return version, df.attrs.get("filter_key", "all")
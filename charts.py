@@ -0,0 +1,111 @@
+# ===================================================
+# Plotly helpers shared by the dashboard pages
+# ===================================================
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+
+def _line(fit, name, color):
+    x = [fit["x_min"], fit["x_max"]]
+    return go.Scatter(
+        x=x,
+        y=[fit["intercept"] + fit["slope"] * v for v in x],
+        mode="lines",
+        name=f"{name} trend",
+        line=dict(color=color, width=2),
+        hovertemplate=(
+            f"<b>{name}</b><br>slope = {fit['slope']:.2f}<br>"
+            f"R² = {fit['r_squared']:.3f}<br>p = {fit['p_value']:.3g}<extra></extra>"
+        ),
+        showlegend=False,
+    )
+
+
+def add_trendlines(fig, fits, facet_col=False, color=None):
+    """Draw the regression lines from `stats_engine.linear_fits` onto `fig`.
+
+    - a single fit ("all") is drawn in `color` (or the first trace's colour),
+    - with `facet_col=True` the i-th fit goes into facet column i + 1, so the
+      figure must be built with the same category order as `fits.index`,
+    - otherwise each fit is matched to the scatter trace of the same name.
+    """
+    if facet_col:
+        for i, (group, fit) in enumerate(fits.iterrows()):
+            line_color = color or fig.data[0].marker.color
+            fig.add_trace(_line(fit, str(group), line_color), row=1, col=i + 1)
+        return fig
+
+    traces = {trace.name: trace for trace in fig.data}
+    for group, fit in fits.iterrows():
+        trace = traces.get(str(group), fig.data[0])
+        line = _line(fit, str(group) if len(fits) > 1 else "OLS", color or trace.marker.color)
+        line.legendgroup = trace.legendgroup
+        fig.add_trace(line)
+    return fig
+
+
+def annotate_test(fig, result):
+    """Add a permutation-test result (see permutation.py) above the plot area."""
+    if result is None:
+        return fig
+    if result["permutations"]:
+        p_value = f"p ≈ {result['p_value']:.3g} ({result['permutations']:,} permutations)"
+    else:
+        p_value = f"p = {result['p_value']:.3g}"  # asymptotic, for large samples
+    fig.add_annotation(
+        text=f"{result['method']}: {result['label']} = {result['statistic']:.2f}, {p_value}",
+        xref="paper", yref="paper",
+        x=1, y=1.02,
+        xanchor="right", yanchor="bottom",
+        showarrow=False,
+        font=dict(size=11, color="gray")
+    )
+    return fig
+
+
+def distribution_figure(stats, points, by, value_col, curves=None, markers="all", colors=None, seed=0):
+    """Box (or violin, when `curves` is given) per group with sampled markers on top.
+
+    The boxes come from `sampling.box_stats` and the violin outlines from
+    `density.group_densities`, both computed over every row; `points` (the
+    sampled rows) are only drawn as jittered markers, or just those beyond
+    the fences with `markers="outliers"`. Groups sit at x = 0, 1, ...
+    labelled with their values.
+    """
+    colors = colors or qualitative.Plotly
+    rng = np.random.default_rng(seed)
+    fig = go.Figure()
+    for i, (group, row) in enumerate(stats.iterrows()):
+        name, color = str(group), colors[i % len(colors)]
+        if curves is not None and group in curves:
+            grid, curve = curves[group]
+            half = 0.4 * curve / curve.max()
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([i - half, (i + half)[::-1]]),
+                y=np.concatenate([grid, grid[::-1]]),
+                fill="toself", mode="lines", line=dict(color=color, width=1),
+                name=name, legendgroup=name, hoverinfo="skip",
+            ))
+        fig.add_trace(go.Box(
+            x=[i], q1=[row["q1"]], median=[row["median"]], q3=[row["q3"]],
+            lowerfence=[row["lowerfence"]], upperfence=[row["upperfence"]], mean=[row["mean"]],
+            width=0.12 if curves is not None else 0.5, boxpoints=False,
+            marker_color=color, name=name, legendgroup=name, showlegend=curves is None,
+        ))
+        values = points[value_col] if by is None else points.loc[points[by] == group, value_col]
+        if markers == "outliers":
+            values = values[(values < row["lowerfence"]) | (values > row["upperfence"])]
+            x = np.full(len(values), float(i))
+        else:
+            x = i + rng.uniform(-0.25, 0.25, len(values))
+        if len(values):
+            fig.add_trace(go.Scatter(
+                x=x, y=values.to_numpy(), mode="markers",
+                marker=dict(color=color, size=4, opacity=0.5),
+                name=name, legendgroup=name, showlegend=False,
+            ))
+    fig.update_xaxes(tickmode="array", tickvals=list(range(len(stats))),
+                     ticktext=[str(group) for group in stats.index])
+    return fig
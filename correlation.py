@@ -0,0 +1,130 @@
+# ===================================================
+# Correlation matrices with pairwise-missing data and significance
+# ===================================================
+#
+# Pearson and Spearman matrices for many columns are built from a handful of
+# matrix products instead of one pass per pair. With M the presence mask and
+# X0 the column-centred values (0 where missing), every pairwise-complete
+# sum is a product: n = M'M, sum_i = X0'M, sum_ij = X0'X0 and
+# sum_ii = (X0^2)'M. Rows are accumulated in blocks to bound memory, and a
+# frame without missing values takes the single-product path. Spearman ranks
+# each column once (vectorized, average ties) and then correlates the ranks;
+# with missing values the ranks are taken over each column's own present
+# rows, the usual approximation for large data.
+#
+# p-values use the t distribution with n - 2 degrees of freedom, and the
+# significance mask controls the false discovery rate (Benjamini-Hochberg)
+# over the distinct pairs. Results are cached per dataset version, filter,
+# column set and method.
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_token
+
+ALPHA = 0.05
+BLOCK_ROWS = 1_000_000
+
+_matrices = LRUCache(maxsize=64, persist="correlation")
+
+
+def _values(df, columns, method):
+    values = df[list(columns)].to_numpy(dtype="float64", na_value=np.nan)
+    if method == "spearman":
+        from scipy.stats import rankdata
+
+        values = rankdata(values, axis=0, nan_policy="omit")
+    elif method != "pearson":
+        raise ValueError(f"Unknown correlation method {method!r}")
+    return values
+
+
+def _pairwise(values, block_rows=BLOCK_ROWS):
+    """Pairwise-complete (r, n) for the columns of `values`."""
+    k = values.shape[1]
+    present = ~np.isnan(values)
+    centre = np.nanmean(values, axis=0) if present.any() else np.zeros(k)
+
+    if present.all():
+        # Single product: no missing values, so every pair uses every row
+        x = values - centre
+        cross = x.T @ x
+        scale = np.sqrt(np.diag(cross))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = cross / np.outer(scale, scale)
+        return r, np.full((k, k), float(len(values)))
+
+    n = np.zeros((k, k))
+    sums = np.zeros((k, k))     # sums[i, j]: sum of x_i over rows where x_j is present too
+    squares = np.zeros((k, k))  # squares[i, j]: the same for x_i^2
+    cross = np.zeros((k, k))
+    for start in range(0, len(values), block_rows):
+        block = values[start:start + block_rows] - centre
+        mask = present[start:start + block_rows].astype("float64")
+        block = np.where(mask > 0, block, 0.0)
+        n += mask.T @ mask
+        sums += block.T @ mask
+        squares += (block * block).T @ mask
+        cross += block.T @ block
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = cross - sums * sums.T / n
+        var_i = squares - sums ** 2 / n
+        r = cov / np.sqrt(var_i * var_i.T)
+    return r, n
+
+
+def _p_values(r, n):
+    from scipy import special
+
+    dof = n - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt(dof / (1 - r * r))
+        p = 2 * special.stdtr(dof, -np.abs(t))
+    p[dof <= 0] = np.nan
+    return p
+
+
+def benjamini_hochberg(p_values):
+    """BH-adjusted q-values for a 1-D array of p-values (NaN stays NaN)."""
+    q = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid):
+        order = valid[np.argsort(p_values[valid])]
+        ranked = p_values[order] * len(valid) / np.arange(1, len(valid) + 1)
+        q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def correlations(df, columns, method="pearson", alpha=ALPHA):
+    """Correlation matrix of `columns` with significance.
+
+    Returns a dict of DataFrames (columns x columns): "r", "n" (pairwise
+    complete rows), "p" (two-sided), "q" (BH-adjusted over distinct pairs)
+    and "significant" (q < alpha, off the diagonal).
+    """
+    columns = tuple(columns)
+
+    def compute():
+        r, n = _pairwise(_values(df, columns, method))
+        np.fill_diagonal(r, 1.0)
+        p = _p_values(np.clip(r, -1.0, 1.0), n)
+
+        upper = np.triu_indices(len(columns), k=1)
+        q = np.full_like(p, np.nan)
+        q[upper] = benjamini_hochberg(p[upper])
+        q.T[upper] = q[upper]
+        np.fill_diagonal(p, np.nan)
+
+        def frame(values):
+            return pd.DataFrame(values, index=list(columns), columns=list(columns))
+
+        return {
+            "r": frame(r),
+            "n": frame(n.astype("int64")),
+            "p": frame(p),
+            "q": frame(q),
+            "significant": frame(np.nan_to_num(q, nan=1.0) < alpha),
+        }
+
+    return _matrices.get_or_compute(("corr", frame_token(df), columns, method, alpha), compute)
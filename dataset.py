@@ -0,0 +1,257 @@
+# ===================================================
+# Shared dataset access for the dashboard pages
+# ===================================================
+#
+# Every page used to run `pd.read_csv(url)` at the top of the script, so each
+# Streamlit rerun downloaded and parsed the CSV again. Pages now call
+# `load_dataset()`, which parses the file once per process and hands back a
+# cheap view of the cached frame.
+#
+# The first parse also validates the file against `SCHEMA`, downcasts it to
+# compact dtypes and writes a Feather sidecar under `.cache/` (requires
+# pyarrow), named after the file's content and the parsing code. The
+# sidecar is then memory-mapped with one array per column and no copy, so
+# the base columns live in the OS page cache: every session in a process,
+# and every process on the host, reads the same pages. Derived label
+# columns (see features.py) are added once, right after loading, as new
+# columns next to the mapped ones. Sessions get shallow copies; pandas
+# copy-on-write keeps any in-place edit a session makes private to it.
+#
+# Frames are cached by content hash, several datasets at a time (the named
+# datasets of registry.py), so switching between them is free once loaded.
+# When a file's content changes, its old frame is dropped together with every
+# cache entry computed from it (`cache.evict_version`).
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from cache import ARTIFACT_SCHEMA, LRUCache, evict_version
+from features import derive_features
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pyarrow is optional; fall back to parsing the CSV
+    feather = None
+
+# SLEEP_ANXIETY_DATA points the pages at another CSV/Parquet file (benchmark.py
+# uses it to render against scaled datasets).
+DATA_FILE = Path(os.environ.get("SLEEP_ANXIETY_DATA") or Path(__file__).with_name("Time_to_think_Norburyy.csv"))
+DATA_URL = "https://raw.githubusercontent.com/nadiashahzanani/Sleep-Anxiety-Visualization/refs/heads/main/Time_to_think_Norburyy.csv"
+
+CACHE_DIR = Path(__file__).with_name(".cache")
+MAX_DATASETS = 8  # parsed frames kept per process (they are memory-mapped)
+
+# Declared column kinds for the Norbury & Evans survey file. Integer columns
+# are downcast to the smallest type that holds them, floats to float32 and
+# low-cardinality text to categoricals.
+SCHEMA = {
+    "University": "int",
+    "Case_Number": "int",
+    "Age": "int",
+    "Sex": "int",
+    "Year_of_Study": "int",
+    "Department_Name": "category",
+    "MEQ": "int",
+    "Trait_Anxiety": "int",
+    "Start_time_code": "int",
+    "Start_time": "category",
+    "PSQI_component_1": "int",
+    "Avg_Weekly_Sleep_Duration": "float",
+    "Avg_Sleep_Working_days": "float",
+    "Avg_sleep_free_days": "float",
+    "Daytime_Dozing": "int",
+    "Daytime_Dozing_Groups": "int",
+    "Cigarettes_dichotomous": "int",
+    "Alcohol_dichotomous": "int",
+    "psqi_2_groups": "int",
+}
+
+# Spellings seen across cohort files, mapped to the canonical column name.
+# Names that differ from a SCHEMA/derived column only by case are matched
+# automatically and need no entry here.
+COLUMN_ALIASES = {
+    "sleep_category": "Sleep_Category",
+    "sleep_quality_category": "Sleep_Category",
+    "psqi_groups": "psqi_2_groups",
+    "department": "Department_Name",
+    "year": "Year_of_Study",
+}
+DERIVED_COLUMNS = ("Chronotype", "Sleep_Quality_Category_Detailed", "Sleep_Category")
+
+_lock = threading.Lock()
+_versions = {}   # (path, mtime_ns, size) -> content hash
+_frames = LRUCache(maxsize=MAX_DATASETS)  # content hash -> parsed DataFrame
+_current = {}    # source (path or URL) -> content hash last served for it
+_parser = None   # see _parser_fingerprint
+
+
+def dataset_version(path=DATA_FILE):
+    """Return the SHA-256 of the file content, re-hashing only when mtime/size change."""
+    path = Path(path)
+    st_ = path.stat()
+    stamp = (str(path.resolve()), st_.st_mtime_ns, st_.st_size)
+    version = _versions.get(stamp)
+    if version is None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+        version = digest.hexdigest()
+        _versions[stamp] = version
+    return version
+
+
+def normalize_columns(df):
+    """Rename alias/mis-cased columns (e.g. `Sleep_category`) to their canonical names."""
+    canonical = {name.lower(): name for name in (*SCHEMA, *DERIVED_COLUMNS)}
+    canonical.update(COLUMN_ALIASES)
+    renames = {}
+    for col in df.columns:
+        target = canonical.get(str(col).strip().lower())
+        if target is not None and target != col and target not in df.columns:
+            renames[col] = target
+    return df.rename(columns=renames) if renames else df
+
+
+def apply_schema(df, schema=SCHEMA):
+    """Validate `df` against `schema` and return it with compact dtypes.
+
+    Raises ValueError when a declared column is missing or holds values
+    that cannot be converted to its declared kind.
+    """
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        raise ValueError(f"Dataset is missing columns: {', '.join(missing)}")
+
+    out = {}
+    for col in df.columns:
+        kind = schema.get(col)
+        values = df[col]
+        try:
+            if kind == "int":
+                values = pd.to_numeric(values, errors="raise")
+                if values.isna().any():
+                    values = values.astype("Int64")
+                values = pd.to_numeric(values, downcast="integer")
+                if values.dtype.kind == "f":
+                    raise ValueError("non-integer values")
+            elif kind == "float":
+                values = pd.to_numeric(values, errors="raise").astype("float32")
+            elif kind == "category":
+                values = values.astype("category")
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Column {col!r} does not match schema kind {kind!r}: {exc}") from exc
+        out[col] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+def _sidecar_prefix(path):
+    # The resolved path is part of the name, so same-named files in different
+    # directories (e.g. survey waves) keep separate sidecars
+    where = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()[:8]
+    return f"{Path(path).stem}-{where}"
+
+
+def _parser_fingerprint():
+    # Sidecars hold the output of normalize_columns/apply_schema, so they are
+    # also named after the declarations and code that produced them: a new
+    # alias or dtype rule must not be answered from an old sidecar
+    global _parser
+    if _parser is None:
+        digest = hashlib.sha256(f"schema {ARTIFACT_SCHEMA}".encode())
+        digest.update(repr((sorted(SCHEMA.items()), sorted(COLUMN_ALIASES.items()), DERIVED_COLUMNS)).encode())
+        digest.update(Path(__file__).read_bytes())
+        _parser = digest.hexdigest()
+    return _parser
+
+
+def _sidecar_path(path, version):
+    return CACHE_DIR / f"{_sidecar_prefix(path)}-{version[:16]}-{_parser_fingerprint()[:8]}.feather"
+
+
+def _write_sidecar(df, path, version):
+    target = _sidecar_path(path, version)
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        for stale in CACHE_DIR.glob(f"{_sidecar_prefix(path)}-*.feather"):
+            if stale != target:  # another process may be mapping the current one
+                stale.unlink(missing_ok=True)
+        # Per-process temporary name: concurrent writers (export workers) each
+        # finish their own file, and the atomic replace keeps the last one
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        # One record batch, so every column maps to a single zero-copy array
+        feather.write_feather(df, tmp, compression="uncompressed", chunksize=max(len(df), 1))
+        tmp.replace(target)
+    except OSError:
+        return False  # read-only deploys just keep parsing the source file
+    return True
+
+
+def _map_sidecar(sidecar):
+    # split_blocks keeps one block per column, so pandas wraps the mapped
+    # buffers instead of consolidating (copying) them
+    return feather.read_table(sidecar, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _read(source, version=None):
+    if feather is not None and version is not None:
+        try:
+            return _map_sidecar(_sidecar_path(source, version))
+        except (OSError, pa.ArrowInvalid):
+            pass  # missing, being replaced, or truncated: parse the source
+
+    if str(source).endswith(".parquet"):
+        # Columnar output of ingest.py / synthetic.py
+        df = apply_schema(normalize_columns(pd.read_parquet(source)))
+    else:
+        df = apply_schema(normalize_columns(pd.read_csv(source)))
+    if feather is not None and version is not None and _write_sidecar(df, source, version):
+        try:
+            return _map_sidecar(_sidecar_path(source, version))
+        except (OSError, pa.ArrowInvalid):
+            pass  # a concurrent writer pruned it; the parsed frame is just as good
+    return df
+
+
+def load_dataset(path=DATA_FILE, url_fallback=DATA_URL):
+    """Return the survey data as a shallow copy of the per-process shared frame.
+
+    The local file is preferred; `url_fallback` is only fetched when the file
+    is missing (pass `None` to stay strictly offline). Callers may add columns
+    to the returned frame without affecting other sessions.
+    """
+    path = Path(path)
+    if path.exists():
+        version = dataset_version(path)
+        source = path
+    elif url_fallback:
+        version = None
+        source = url_fallback
+    else:
+        raise FileNotFoundError(f"Dataset not found: {path}")
+
+    key = version or "url:" + url_fallback
+
+    def parse():
+        df = derive_features(_read(source, version))
+        df.attrs["dataset_version"] = key
+        if version is not None:
+            df.attrs["dataset_path"] = str(path.resolve())  # see query_backend.py
+        return df
+
+    df = _frames.get_or_compute(key, parse)
+    origin = str(path.resolve()) if version is not None else url_fallback
+    with _lock:
+        previous, _current[origin] = _current.get(origin), key
+        # Identical files share a version; keep it while any of them serves it
+        stale = previous is not None and previous not in _current.values()
+    if stale:
+        # The file changed: nothing computed from the old content is served again
+        _frames.discard(lambda k: k == previous)
+        evict_version(previous)
+    return df.copy(deep=False)
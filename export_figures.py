@@ -0,0 +1,200 @@
+# ===================================================
+# Batch export of every dashboard figure to static files
+# ===================================================
+#
+#   python export_figures.py                                  # all figures, default dataset, HTML + JSON
+#   python export_figures.py --filter Sex=2 --filter Year_of_Study=1,2 --formats html svg
+#   python export_figures.py --data waves/*.parquet --cohorts cohorts.json --workers 8
+#   python export_figures.py --data "Wave 2"                  # a name from datasets.json
+#
+# Figures are built by the same registered builders the pages use
+# (figures.FIGURES via `figure_spec`), so exports match the dashboard and
+# reuse the in-process caches and the precomputed artifact store. Each
+# (dataset, cohort) pair is one task on a process pool; every task writes
+#
+#   <out>/<dataset>/<cohort>/<figure id>.<format>  plus an index.html
+#
+# <dataset> is the registered name (datasets.json) of the file, or its stem
+# for unregistered files. A cohort is a filter selection ({column: [values]})
+# as in the sidebar; --cohorts takes a JSON object of named selections.
+# Cohorts whose selection does not apply to a dataset (unknown column or
+# value, no matching rows) are skipped; any other failure fails the run with
+# a non-zero exit code. SVG/PNG output needs the optional kaleido package.
+
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from dataset import DATA_FILE
+
+FORMATS = ("html", "json", "svg", "png")
+DEFAULT_FORMATS = ("html", "json")
+OUT_DIR = Path("exports")
+
+
+class SkippedCohort(ValueError):
+    """The cohort's selection does not apply to the dataset, or leaves too few rows to chart."""
+
+
+def _parse_filters(items):
+    """["Sex=2", "Year_of_Study=1,2"] -> {"Sex": ["2"], "Year_of_Study": ["1", "2"]}."""
+    selections = {}
+    for item in items:
+        col, sep, values = item.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Filters look like COLUMN=VALUE[,VALUE...], got {item!r}")
+        selections.setdefault(col.strip(), []).extend(v.strip() for v in values.split(","))
+    return selections
+
+
+def _write(fig, spec, path, fmt):
+    import plotly.io as pio
+
+    if fmt == "json":
+        path.write_text(spec, encoding="utf-8")
+    elif fmt == "html":
+        pio.write_html(fig, path, include_plotlyjs="cdn", full_html=True)
+    else:
+        pio.write_image(fig, path, format=fmt)
+
+
+def _index_page(title, entries):
+    items = "\n".join(
+        f'<li><a href="{html.escape(name)}">{html.escape(figure_id)}</a> {html.escape(label)}</li>'
+        for figure_id, name, label in entries
+    )
+    return f"<!doctype html>\n<title>{html.escape(title)}</title>\n<h1>{html.escape(title)}</h1>\n<ul>\n{items}\n</ul>\n"
+
+
+def export_cohort(data_path, cohort, selections, out_dir, formats=DEFAULT_FORMATS, figure_ids=None,
+                  label=None):
+    """Render the figures for one dataset and cohort; returns (cohort dir, files written).
+
+    Raises SkippedCohort when `selections` does not apply to the dataset or
+    matches fewer than `filters.MIN_COHORT` respondents, the same cut-off the
+    dashboard applies to its sidebar filters.
+    """
+    import plotly.io as pio
+
+    from dataset import load_dataset
+    from figures import FIGURES, figure_spec
+    from filters import MIN_COHORT, filter_frame, resolve_selections
+
+    df = load_dataset(data_path, url_fallback=None)
+    if selections:
+        try:
+            df = filter_frame(df, resolve_selections(df, selections))
+        except ValueError as exc:
+            raise SkippedCohort(str(exc)) from exc
+    if df.empty:
+        raise SkippedCohort("no respondents match")
+    if len(df) < MIN_COHORT:
+        raise SkippedCohort(f"only {len(df)} respondent(s) match, fewer than {MIN_COHORT}")
+    label = label or Path(data_path).stem
+    target = Path(out_dir) / label / cohort
+
+    written, entries = 0, []
+    for figure_id in figure_ids or FIGURES:
+        spec = figure_spec(figure_id, df)
+        fig = pio.from_json(spec)
+        target.mkdir(parents=True, exist_ok=True)  # only once a figure has been built
+        for fmt in formats:
+            _write(fig, spec, target / f"{figure_id}.{fmt}", fmt)
+            written += 1
+        title = fig.layout.title.text or ""
+        entries.append((figure_id, f"{figure_id}.{formats[0]}", title))
+    heading = f"{label} — {cohort} ({len(df):,} respondents)"
+    (target / "index.html").write_text(_index_page(heading, entries), encoding="utf-8")
+    return target, written
+
+
+def export(datasets, cohorts, out_dir=OUT_DIR, formats=DEFAULT_FORMATS, figure_ids=None, workers=None):
+    """Export every (dataset, cohort) pair in parallel.
+
+    `datasets` maps an output name to a dataset file. Returns (files written,
+    failed tasks); skipped cohorts are reported but do not count as failures.
+    """
+    tasks = [(label, str(path), name, selections)
+             for label, path in datasets.items() for name, selections in cohorts.items()]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    total, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(export_cohort, path, name, selections, out_dir, formats, figure_ids, label): (label, name)
+            for label, path, name, selections in tasks
+        }
+        for future in as_completed(futures):
+            label, name = futures[future]
+            try:
+                target, written = future.result()
+            except SkippedCohort as exc:
+                print(f"  {label}/{name}: skipped ({exc})")
+                continue
+            except Exception as exc:
+                failed += 1
+                print(f"  {label}/{name}: FAILED ({type(exc).__name__}: {exc})")
+                continue
+            total += written
+            print(f"  {target}: {written} files")
+    return total, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every dashboard figure to static files.")
+    parser.add_argument("--data", nargs="+", default=[str(DATA_FILE)], help="registered dataset names or files (CSV or Parquet)")
+    parser.add_argument("--filter", action="append", default=[], metavar="COLUMN=V1[,V2]",
+                        help="cohort filter, repeatable (one cohort)")
+    parser.add_argument("--cohorts", help="JSON file of {name: {column: [values]}}")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(DEFAULT_FORMATS))
+    parser.add_argument("--figures", nargs="+", help="figure ids (default: all)")
+    parser.add_argument("--out", default=str(OUT_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    from figures import FIGURES
+
+    unknown = [f for f in args.figures or [] if f not in FIGURES]
+    if unknown:
+        parser.error(f"unknown figures: {', '.join(unknown)}")
+    if {"svg", "png"} & set(args.formats):
+        import importlib.util
+
+        if importlib.util.find_spec("kaleido") is None:
+            parser.error("SVG/PNG export needs the kaleido package (pip install kaleido)")
+
+    if args.cohorts:
+        cohorts = json.loads(Path(args.cohorts).read_text(encoding="utf-8"))
+    elif args.filter:
+        try:
+            selections = _parse_filters(args.filter)
+        except ValueError as exc:
+            parser.error(str(exc))
+        name = "_".join(f"{col}-{'+'.join(values)}" for col, values in selections.items())
+        cohorts = {name: selections}
+    else:
+        cohorts = {"all": {}}
+
+    from registry import output_name, path_for
+
+    datasets = {}
+    for item in args.data:
+        path = Path(path_for(item)).resolve()
+        label = output_name(path)
+        if datasets.get(label, path) != path:
+            label = f"{path.parent.name}-{label}"  # unregistered files with the same stem
+        datasets[label] = path
+
+    start = time.perf_counter()
+    total, failed = export(datasets, cohorts, args.out, tuple(args.formats), args.figures, args.workers)
+    print(f"Wrote {total} files in {time.perf_counter() - start:.1f} s"
+          + (f"; {failed} task(s) failed" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# ===================================================
+# Derived columns shared by all dashboard pages
+# ===================================================
+#
+# Chronotype and sleep-quality labels used to be re-derived on every page with
+# a row-by-row `.apply`. They are now binned once, vectorized, when the dataset
+# is loaded, and stored as categoricals.
+
+import numpy as np
+import pandas as pd
+
+# MEQ cut points: below the first is Evening, below the second Intermediate,
+# anything at or above the second is Morning.
+MEQ_THRESHOLDS = (40, 60)
+CHRONOTYPE_LABELS = ("Evening Type", "Intermediate Type", "Morning Type")
+
+# psqi_2_groups codes and their labels; anything else is reported as "Other".
+PSQI_LABELS = {1: "Good Sleep", 2: "Poor Sleep"}
+
+
+def chronotype(meq, thresholds=MEQ_THRESHOLDS):
+    low, high = thresholds
+    return pd.cut(
+        meq,
+        bins=[-np.inf, low, high, np.inf],
+        right=False,
+        labels=list(CHRONOTYPE_LABELS),
+    )
+
+
+def sleep_quality_category(psqi, labels=PSQI_LABELS, other="Other"):
+    codes = list(labels)
+    names = list(labels.values())
+    values = np.select([psqi.to_numpy() == code for code in codes], names, default=other)
+    return pd.Series(
+        pd.Categorical(values, categories=names + [other]),
+        index=psqi.index,
+        name=psqi.name,
+    )
+
+
+def derive_features(df, meq_thresholds=MEQ_THRESHOLDS, psqi_labels=PSQI_LABELS):
+    """Return `df` with the derived label columns added (the input is not modified)."""
+    sleep_category = sleep_quality_category(df["psqi_2_groups"], psqi_labels)
+    return df.assign(
+        Chronotype=chronotype(df["MEQ"], meq_thresholds),
+        Sleep_Quality_Category_Detailed=sleep_category,
+        Sleep_Category=sleep_category.cat.remove_unused_categories(),
+    )
@@ -0,0 +1,439 @@
+# ===================================================
+# Figure builders for every dashboard chart, with a spec cache
+# ===================================================
+#
+# Each chart is built by a function registered under a figure id
+# ("home.3", "obj2.2.1", ...). Pages call `cached_figure(figure_id, df)`,
+# which serves the serialized Plotly spec from a size-bounded LRU keyed on
+# (dataset version, filter, figure id, parameters) and only runs the builder
+# on a miss. Hits are handed back as unvalidated Figures, which st.plotly_chart
+# serializes without re-validating: rendering all 15 cached figures takes
+# ~0.04 s, against ~0.2 s when passed as dicts and ~0.6 s to rebuild them.
+# plotly.express is imported inside the builders that use it, so importing
+# this module stays cheap for the pages (see startup_budget.py).
+
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+from aggregate import crosstab, histogram, histogram2d
+from bootstrap import correlation_cis
+from cache import LRUCache, frame_token
+from charts import add_trendlines, annotate_test, distribution_figure
+from correlation import ALPHA, correlations
+from density import density, group_densities
+from group_stats import group_summary
+from instrument import record_figure
+from permutation import anova_test, chi2_test
+from sampling import box_stats, sample_points
+from stats_engine import linear_fits, ols, pearson
+
+MAX_SPEC_BYTES = 64 * 1024 * 1024
+
+HOME_COLORS = ["#4a90e2", "#f45b69", "#90c978", "#ffb74d"]
+
+# Identifiers stored as integers; never correlated
+ID_COLUMNS = ("University", "Case_Number")
+
+# Objectives 2 (2.2): candidate continuous measures, filtered to those present
+CONTINUOUS_COLS = ['psqi_2_groups', 'Trait_Anxiety', 'Avg_Weekly_Sleep_Duration',
+                   'Avg_Sleep_Working_days', 'Avg_sleep_free_days', 'Daytime_Dozing', 'Age', 'MEQ']
+
+FIGURES = {}
+
+_specs = LRUCache(maxsize=512, maxbytes=MAX_SPEC_BYTES, sizeof=len, persist="figures")
+
+
+def _figure(figure_id):
+    def register(build):
+        FIGURES[figure_id] = build
+        return build
+    return register
+
+
+def _mark_significance(fig, result, show_r):
+    """Star FDR-significant cells of a correlation heatmap and put p/q in the hover."""
+    r = result["r"].to_numpy()
+    stars = np.where(result["significant"].to_numpy(), "*", "")
+    text = np.char.add(np.char.mod("%.2f", r), stars) if show_r else stars
+    fig.update_traces(
+        text=text,
+        texttemplate="%{text}",
+        customdata=np.dstack([result["p"].to_numpy(), result["q"].to_numpy(), result["n"].to_numpy()]),
+        hovertemplate=("%{y} × %{x}<br>r = %{z:.2f}<br>p = %{customdata[0]:.3g}, "
+                       "q = %{customdata[1]:.3g}<br>n = %{customdata[2]}<extra></extra>"),
+    )
+    fig.add_annotation(
+        text=f"* significant at FDR {ALPHA:g} (Benjamini–Hochberg)",
+        xref="paper", yref="paper", x=1, y=1.02, xanchor="right", yanchor="bottom",
+        showarrow=False, font=dict(size=11, color="gray"),
+    )
+    return fig
+
+
+def figure_spec(figure_id, df, **params):
+    """Serialized Plotly JSON for `figure_id`, built on a cache miss only."""
+    key = (frame_token(df), figure_id, tuple(sorted(params.items())))
+    return _specs.get_or_compute(key, lambda: FIGURES[figure_id](df, **params).to_json())
+
+
+def cached_figure(figure_id, df, **params):
+    """Figure ready for `st.plotly_chart`, rebuilt from the cached spec without validation."""
+    spec = figure_spec(figure_id, df, **params)
+    record_figure(len(spec))
+    # st.plotly_chart re-validates plain dicts through go.Figure (~10 ms a
+    # figure); a Figure it takes as already validated. The spec was produced
+    # by a validated Figure, so checking it again on every rerun is wasted.
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+# ------------------------------------------------------------
+# Homepage
+# ------------------------------------------------------------
+@_figure("home.1")
+def home_sleep_histogram(df):
+    import plotly.express as px
+
+    # Bins are counted server-side, so the figure carries one bar per bin
+    hist = histogram(df, "psqi_2_groups", nbins=15)
+    fig = px.bar(
+        hist,
+        x="center",
+        y="count",
+        hover_data=["left", "right"],
+        color_discrete_sequence=[HOME_COLORS[0]],
+        title="1️⃣ Distribution of Sleep Quality (psqi_2_groups)"
+    )
+    fig.update_traces(width=hist["width"])
+    fig.update_layout(xaxis_title="PSQI (Higher = Poorer Sleep)", yaxis_title="Count", bargap=0,
+                      template="plotly_white")
+    return fig
+
+
+@_figure("home.2")
+def home_anxiety_histogram(df):
+    import plotly.express as px
+
+    hist = histogram(df, "Trait_Anxiety", nbins=15)
+    fig = px.bar(
+        hist,
+        x="center",
+        y="count",
+        hover_data=["left", "right"],
+        color_discrete_sequence=[HOME_COLORS[1]],
+        title="2️⃣ Distribution of Trait Anxiety Scores"
+    )
+    fig.update_traces(width=hist["width"])
+    fig.update_layout(xaxis_title="Trait Anxiety Score", yaxis_title="Frequency", bargap=0,
+                      template="plotly_white")
+    return fig
+
+
+@_figure("home.3")
+def home_sleep_anxiety_scatter(df):
+    import plotly.express as px
+
+    r, p = pearson(df, "psqi_2_groups", "Trait_Anxiety")
+    r_ci = correlation_cis(df, "psqi_2_groups", "Trait_Anxiety")["r"]
+    points, _ = sample_points(df, None, "Trait_Anxiety")
+    fig = px.scatter(
+        points,
+        x="psqi_2_groups",
+        y="Trait_Anxiety",
+        color_discrete_sequence=[HOME_COLORS[2]],
+        title=(f"3️⃣ Relationship Between Sleep Quality and Anxiety "
+               f"(r = {r:.2f}, 95% CI [{r_ci['low']:.2f}, {r_ci['high']:.2f}], p = {p:.3g})")
+    )
+    add_trendlines(fig, linear_fits(df, "psqi_2_groups", "Trait_Anxiety"))
+    fig.update_layout(
+        xaxis_title="Sleep Quality (Higher = Poorer Sleep)",
+        yaxis_title="Trait Anxiety Score",
+        template="plotly_white"
+    )
+    return fig
+
+
+@_figure("home.4")
+def home_anxiety_by_sleep_category(df):
+    # Boxes from full-data quartiles; only sampled outliers are sent as markers
+    points, _ = sample_points(df, "Sleep_Category", "Trait_Anxiety")
+    fig = distribution_figure(box_stats(df, "Sleep_Category", "Trait_Anxiety"), points,
+                              "Sleep_Category", "Trait_Anxiety", markers="outliers",
+                              colors=[HOME_COLORS[0], HOME_COLORS[1]])
+    fig.update_layout(title="4️⃣ Trait Anxiety by Sleep Category",
+                      xaxis_title="Sleep Category", yaxis_title="Anxiety Score", template="plotly_white")
+    return annotate_test(fig, anova_test(df, "Trait_Anxiety", "Sleep_Category"))
+
+
+@_figure("home.5")
+def home_start_time_by_chronotype(df):
+    import plotly.express as px
+
+    ctab = crosstab(df, "Start_time_code", "MEQ").rename(columns={"MEQ": "Chronotype"})
+    fig = px.bar(
+        ctab,
+        x="Start_time_code",
+        y="Count",
+        color="Chronotype",
+        color_discrete_sequence=HOME_COLORS,
+        barmode="group",
+        title="5️⃣ Preferred Start Time by Chronotype"
+    )
+    fig.update_layout(xaxis_title="Preferred Start Time", yaxis_title="Count", template="plotly_white")
+    return fig
+
+
+@_figure("home.6")
+def home_correlation_matrix(df):
+    columns = [col for col in df.select_dtypes(include=np.number).columns if col not in ID_COLUMNS]
+    result = correlations(df, columns)
+    corr = result["r"].round(2)
+    fig = go.Figure(
+        data=go.Heatmap(
+            z=corr.values,
+            x=corr.columns,
+            y=corr.columns,
+            colorscale="RdBu",
+            reversescale=True
+        )
+    )
+    fig.update_layout(title="6️⃣ Correlation Matrix: Sleep, Anxiety & Behavioral Variables",
+                      template="plotly_white")
+    return _mark_significance(fig, result, show_r=False)
+
+
+# ------------------------------------------------------------
+# Objectives 1
+# ------------------------------------------------------------
+@_figure("obj1.1.1")
+def obj1_sleep_quality_distribution(df):
+    # Density-normalized histogram plus a cached binned KDE (see density.py)
+    dist = density(df, 'psqi_2_groups')
+    mean_psqi = dist['mean']
+    median_psqi = dist['median']
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=dist['hist']['center'],
+        y=dist['hist']['density'],
+        width=dist['hist']['width'],
+        name='Distribution of Sleep Quality',
+        legendgroup='Distribution of Sleep Quality',
+        marker=dict(color='rgb(31, 119, 180)'),
+        opacity=0.7
+    ))
+    fig.add_trace(go.Scatter(
+        x=dist['x'],
+        y=dist['y'],
+        mode='lines',
+        name='Distribution of Sleep Quality',
+        legendgroup='Distribution of Sleep Quality',
+        line=dict(color='rgb(31, 119, 180)'),
+        showlegend=False
+    ))
+    fig.update_layout(bargap=0)
+
+    # Add mean and median lines
+    fig.add_shape(
+        type="line",
+        x0=mean_psqi, y0=0,
+        x1=mean_psqi, y1=1,
+        line=dict(color="red", width=2, dash="dash"),
+        xref='x', yref='paper'
+    )
+    fig.add_annotation(
+        x=mean_psqi, y=1,
+        xref='x', yref='paper',
+        text=f"Mean: {mean_psqi:.2f}",
+        showarrow=False, yshift=10,
+        font=dict(color="red")
+    )
+
+    fig.add_shape(
+        type="line",
+        x0=median_psqi, y0=0,
+        x1=median_psqi, y1=1,
+        line=dict(color="green", width=2, dash="dash"),
+        xref='x', yref='paper'
+    )
+    fig.add_annotation(
+        x=median_psqi, y=1,
+        xref='x', yref='paper',
+        text=f"Median: {median_psqi:.2f}",
+        showarrow=False, yshift=-10,
+        font=dict(color="green")
+    )
+
+    fig.update_layout(
+        title_text=" - Distribution of Sleep Quality (PSQI) with Mean and Median",
+        xaxis_title="PSQI Score (Higher = Poorer Sleep)",
+        yaxis_title="Density",
+        template="plotly_white",
+        width=800,
+        height=500
+    )
+    return fig
+
+
+@_figure("obj1.1.2")
+def obj1_anxiety_by_year(df):
+    # Boxes from full-data quartiles; markers are capped at the point budget, see sampling.py
+    points, _ = sample_points(df, 'Year_of_Study', 'Trait_Anxiety')
+    fig = distribution_figure(box_stats(df, 'Year_of_Study', 'Trait_Anxiety'), points,
+                              'Year_of_Study', 'Trait_Anxiety')  # all sampled points, coloured by year
+    fig.update_layout(title=' - Trait Anxiety by Year of Study',
+                      xaxis_title='Year of Study', yaxis_title='Trait Anxiety Score',
+                      legend_title_text='Year_of_Study')
+    return annotate_test(fig, anova_test(df, 'Trait_Anxiety', 'Year_of_Study'))
+
+
+@_figure("obj1.1.3")
+def obj1_sleep_category_by_sex(df):
+    import plotly.express as px
+
+    # Grouped bars from pre-counted (Sex, category) pairs
+    counts = crosstab(df, 'Sex', 'Sleep_Quality_Category_Detailed', name='Number of Students')
+    fig = px.bar(
+        counts,
+        x='Sex',
+        y='Number of Students',
+        color='Sleep_Quality_Category_Detailed',
+        barmode='group',
+        title=' - Sleep Quality Category Distribution by Sex',
+        labels={'Sex': 'Sex', 'Sleep_Quality_Category_Detailed': 'Sleep Quality Category'}
+    )
+    fig.update_layout(yaxis_title="Number of Students")
+    return annotate_test(fig, chi2_test(df, 'Sex', 'Sleep_Quality_Category_Detailed'))
+
+
+# ------------------------------------------------------------
+# Objectives 2
+# ------------------------------------------------------------
+@_figure("obj2.2.1")
+def obj2_sleep_anxiety_scatter(df):
+    import plotly.express as px
+
+    model = ols(df, 'psqi_2_groups', 'Trait_Anxiety')
+    r2_ci = correlation_cis(df, 'psqi_2_groups', 'Trait_Anxiety')['r_squared']
+    # Markers are capped at the point budget; the regression lines use every row
+    points, _ = sample_points(df, 'Chronotype', 'Trait_Anxiety')
+    fig = px.scatter(
+        points,
+        x='psqi_2_groups',
+        y='Trait_Anxiety',
+        color='Chronotype',
+        title=(f" - Sleep Quality vs Trait Anxiety (R² = {model['r_squared']:.2f}, "
+               f"95% CI [{r2_ci['low']:.2f}, {r2_ci['high']:.2f}], p = {model['p_value']:.4f})"),
+        labels={'psqi_2_groups': 'PSQI (Sleep Quality)', 'Trait_Anxiety': 'Trait Anxiety'}
+    )
+    return add_trendlines(fig, linear_fits(df, 'psqi_2_groups', 'Trait_Anxiety', by='Chronotype'))
+
+
+@_figure("obj2.2.2")
+def obj2_correlation_heatmap(df):
+    import plotly.express as px
+
+    continuous_cols = [col for col in CONTINUOUS_COLS if col in df.columns]
+    result = correlations(df, continuous_cols, method='pearson')
+    fig = px.imshow(result["r"],
+                    aspect="auto",
+                    title=' - Correlation Matrix Heatmap of Key Variables',
+                    labels=dict(color="Correlation"))
+    fig.update_layout(xaxis_showgrid=False,
+                      yaxis_showgrid=False,
+                      xaxis_nticks=len(continuous_cols),
+                      yaxis_nticks=len(continuous_cols))
+    # Annotate with correlation values, starred where FDR-significant
+    return _mark_significance(fig, result, show_r=True)
+
+
+@_figure("obj2.2.3")
+def obj2_sleep_anxiety_by_chronotype(df):
+    import plotly.express as px
+
+    fits = linear_fits(df, 'psqi_2_groups', 'Trait_Anxiety', by='Chronotype')
+    points, _ = sample_points(df, 'Chronotype', 'Trait_Anxiety')
+    fig = px.scatter(
+        points,
+        x='psqi_2_groups',
+        y='Trait_Anxiety',
+        facet_col='Chronotype',
+        category_orders={'Chronotype': list(fits.index)},  # facet i <-> fit i
+        title=' - Sleep Quality vs Trait Anxiety by Chronotype',
+        labels={'psqi_2_groups': 'PSQI (Sleep Quality)', 'Trait_Anxiety': 'Trait Anxiety'}
+    )
+    return add_trendlines(fig, fits, facet_col=True)
+
+
+# ------------------------------------------------------------
+# Objectives 3
+# ------------------------------------------------------------
+@_figure("obj3.3.1")
+def obj3_start_time_by_chronotype(df):
+    # Violins and inner boxes from every row; markers are capped at the point
+    # budget (stratified by chronotype, see sampling.py)
+    points, _ = sample_points(df, 'Chronotype', 'Start_time_code')
+    fig = distribution_figure(box_stats(df, 'Chronotype', 'Start_time_code'), points,
+                              'Chronotype', 'Start_time_code',
+                              curves=group_densities(df, 'Chronotype', 'Start_time_code'),
+                              colors=[qualitative.Plotly[0]])
+    fig.update_layout(title='- Preferred Start Time by Chronotype', showlegend=False,
+                      xaxis_title='Chronotype', yaxis_title='Preferred Start Time')
+    return fig
+
+
+@_figure("obj3.3.2")
+def obj3_start_time_vs_sleep_quality(df):
+    # Count (start time, PSQI) cells server-side and draw them as a heatmap
+    x_centers, y_centers, counts = histogram2d(df, 'Start_time_code', 'psqi_2_groups')
+    fig = go.Figure(
+        go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=counts,
+            colorscale='Blues',
+            colorbar=dict(title='count'),
+            hovertemplate='Start time code: %{x}<br>PSQI: %{y}<br>count: %{z}<extra></extra>'
+        )
+    )
+    fig.update_layout(
+        title=' - Preferred Start Time vs Sleep Quality',
+        xaxis_title='Preferred Start Time Code',
+        yaxis_title='PSQI (Sleep Quality)'
+    )
+    return fig
+
+
+@_figure("obj3.3.3")
+def obj3_start_time_by_year(df):
+    import plotly.express as px
+
+    means = group_summary(df, 'Year_of_Study', ['Start_time_code', 'psqi_2_groups'])['mean']
+    mean_start_time_quality = means.rename(columns={
+        'Start_time_code': 'Mean_Start_Time_Code',
+        'psqi_2_groups': 'Mean_Sleep_Quality'
+    }).reset_index()
+
+    fig = px.bar(
+        mean_start_time_quality,
+        x='Year_of_Study',
+        y='Mean_Start_Time_Code',
+        title=' - Mean Preferred Start Time by Year of Study',
+        labels={'Year_of_Study': 'Year of Study', 'Mean_Start_Time_Code': 'Mean Preferred Start Time Code'},
+        text='Mean_Start_Time_Code',  # optional: show bar values
+        color='Mean_Start_Time_Code',  # optional: color by height
+        color_continuous_scale='Blues'
+    )
+
+    # Add annotations for mean sleep quality
+    for index, row in mean_start_time_quality.iterrows():
+        fig.add_annotation(
+            x=row['Year_of_Study'],
+            y=row['Mean_Start_Time_Code'],
+            text=f"Sleep Quality: {row['Mean_Sleep_Quality']:.2f}",
+            showarrow=False,
+            yshift=10
+        )
+    return fig
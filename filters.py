@@ -0,0 +1,123 @@
+# ===================================================
+# Cohort filters backed by precomputed bitmap masks
+# ===================================================
+#
+# For every filterable column a packed bitmap (np.packbits) is built once per
+# dataset version for each distinct value. A filter selection is then an OR
+# of bitmaps within a column and an AND across columns, touching n / 8 bytes
+# per bitmap instead of re-scanning the DataFrame on every rerun. Filtered
+# frames are cached too, so sessions with the same selection share one copy
+# of the matching rows.
+
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cache import LRUCache, frame_token
+
+FILTER_COLUMNS = ["University", "Department_Name", "Sex", "Year_of_Study", "Chronotype", "Start_time_code"]
+MAX_SUBSET_BYTES = 256 * 1024 * 1024
+MIN_COHORT = 10  # smaller selections are neither charted nor exported (statistics need a few rows)
+
+_indexes = LRUCache(maxsize=8)
+_masks = LRUCache(maxsize=256)
+_subsets = LRUCache(maxsize=32, maxbytes=MAX_SUBSET_BYTES,
+                    sizeof=lambda frame: int(frame.memory_usage(index=True).sum()))
+
+
+class MaskIndex:
+    """Packed per-value bitmaps for the filter columns of one frame."""
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n = len(df)
+        self.bitmaps = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=True)
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code) for code, value in enumerate(uniques.tolist())
+            }
+
+    def values(self, col):
+        return list(self.bitmaps.get(col, {}))
+
+    def mask(self, selections):
+        """Boolean row mask for {column: [values]}; empty selections do not filter."""
+        combined = None
+        for col, chosen in selections.items():
+            if not chosen:
+                continue
+            bitmaps = self.bitmaps[col]
+            column_bits = np.bitwise_or.reduce([bitmaps[value] for value in chosen if value in bitmaps]
+                                               or [np.zeros((self.n + 7) // 8, dtype=np.uint8)])
+            combined = column_bits if combined is None else combined & column_bits
+        if combined is None:
+            return None
+        return np.unpackbits(combined, count=self.n).astype(bool)
+
+
+def mask_index(df, columns=FILTER_COLUMNS):
+    return _indexes.get_or_compute((frame_token(df), tuple(columns)), lambda: MaskIndex(df, columns))
+
+
+def resolve_selections(df, selections):
+    """Map selection values given as text (CLI, JSON) onto the column's own values.
+
+    Raises ValueError for unknown columns or values.
+    """
+    index = mask_index(df)
+    resolved = {}
+    for col, chosen in selections.items():
+        if col not in index.bitmaps:
+            raise ValueError(f"Cannot filter on {col!r}; filterable columns: {', '.join(index.bitmaps)}")
+        by_text = {str(value): value for value in index.values(col)}
+        unknown = [str(value) for value in chosen if str(value) not in by_text]
+        if unknown:
+            raise ValueError(f"Unknown {col} values: {', '.join(unknown)}")
+        resolved[col] = [by_text[str(value)] for value in chosen]
+    return resolved
+
+
+def filter_key(selections):
+    """Canonical string for a selection, used to key every downstream cache."""
+    active = {col: sorted(map(str, chosen)) for col, chosen in selections.items() if chosen}
+    return json.dumps(active, sort_keys=True) if active else "all"
+
+
+def filter_frame(df, selections):
+    """Rows of `df` matching `selections`, tagged with their filter key."""
+    key = filter_key(selections)
+    if key == "all":
+        return df
+
+    def subset():
+        mask = _masks.get_or_compute((frame_token(df), key), lambda: mask_index(df).mask(selections))
+        filtered = df[mask]
+        filtered.attrs = {**df.attrs, "filter_key": key}
+        return filtered
+
+    return _subsets.get_or_compute((frame_token(df), key), subset).copy(deep=False)
+
+
+def sidebar_filters(df):
+    """Render the cohort filter widgets in the sidebar and return the filtered frame."""
+    index = mask_index(df)
+    st.sidebar.header("Cohort filters")
+    selections = {
+        col: st.sidebar.multiselect(col.replace("_", " "), index.values(col), key=f"filter_{col}")
+        for col in index.bitmaps
+    }
+    filtered = filter_frame(df, selections)
+    if filtered is not df:
+        st.sidebar.caption(f"{len(filtered):,} of {len(df):,} respondents selected")
+    if filtered.empty:
+        st.warning("No respondents match the selected filters.")
+        st.stop()
+    if len(filtered) < MIN_COHORT:
+        st.warning(f"Only {len(filtered)} respondent(s) match the selected filters; "
+                   f"select a cohort of at least {MIN_COHORT} to see the charts.")
+        st.stop()
+    return filtered
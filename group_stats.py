@@ -0,0 +1,128 @@
+# ===================================================
+# Incremental per-group summary statistics
+# ===================================================
+#
+# Means, variances, counts and ranges per group key are answered from a small
+# table of sufficient statistics (count, sum, centred sum of squares, min,
+# max) instead of rescanning the rows. New survey waves are folded in with
+# `update()`; partial tables merge with the parallel-variance formula
+# (Chan et al.), which stays accurate where sum-of-squares would cancel.
+# Summaries of unfiltered data are served from the stores ingest.py built
+# while streaming the file (kept in the artifact store under the file's
+# version), else answered by the query backend, else computed here.
+
+import numpy as np
+import pandas as pd
+
+import query_backend
+from cache import LRUCache, frame_token
+
+STATS = ("count", "sum", "m2", "min", "max")
+
+_stores = LRUCache(maxsize=64, persist="group_stats")
+_ingested = LRUCache(maxsize=8, persist="group_stores")  # token -> {keys: GroupStats}, see ingest.py
+
+
+class GroupStats:
+    """Sufficient statistics of `values` per combination of `keys` (or overall)."""
+
+    def __init__(self, keys, values):
+        self.keys = [keys] if isinstance(keys, str) else list(keys or [])
+        self.values = list(values)
+        self.table = None  # stat -> DataFrame (index: group, columns: values)
+
+    @classmethod
+    def from_frame(cls, df, keys, values):
+        store = cls(keys, values)
+        store.update(df)
+        return store
+
+    def _partial(self, df):
+        values = df[self.values].astype("float64")
+        keys = [df[k] for k in self.keys] if self.keys else np.zeros(len(df), dtype=np.int8)
+        grouped = values.groupby(keys, observed=True)
+        count = grouped.count()
+        return {
+            "count": count,
+            "sum": grouped.sum(),
+            "m2": grouped.var(ddof=0).fillna(0.0) * count,
+            "min": grouped.min(),
+            "max": grouped.max(),
+        }
+
+    def update(self, df):
+        """Fold the rows of `df` into the store; returns self."""
+        part = self._partial(df)
+        if self.table is None:
+            self.table = part
+            return self
+
+        old = self.table
+        index = old["count"].index.union(part["count"].index)
+        a = {stat: frame.reindex(index) for stat, frame in old.items()}
+        b = {stat: frame.reindex(index) for stat, frame in part.items()}
+        na, nb = a["count"].fillna(0), b["count"].fillna(0)
+        n = na + nb
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = b["sum"].fillna(0) / nb - a["sum"].fillna(0) / na
+            cross = (delta ** 2 * na * nb / n).where((na > 0) & (nb > 0), 0.0)
+        self.table = {
+            "count": n,
+            "sum": a["sum"].fillna(0) + b["sum"].fillna(0),
+            "m2": a["m2"].fillna(0) + b["m2"].fillna(0) + cross,
+            "min": np.fmin(a["min"], b["min"]),
+            "max": np.fmax(a["max"], b["max"]),
+        }
+        return self
+
+    def summary(self):
+        """stat -> DataFrame (groups x values) for count, mean, var, std, min and max."""
+        count = self.table["count"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self.table["sum"] / count
+            var = (self.table["m2"] / (count - 1)).where(count > 1)
+        return {
+            "count": count,
+            "mean": mean,
+            "var": var,
+            "std": np.sqrt(var),
+            "min": self.table["min"],
+            "max": self.table["max"],
+        }
+
+
+def ingested_key(token):
+    """Cache key of the stores ingest.py saved for the dataset `token`."""
+    return ("group_stores", token)
+
+
+def _from_ingested(df, keys, values):
+    token = frame_token(df)
+    if token[1] != "all":
+        return None
+    store = _ingested.get_or_compute(ingested_key(token), dict).get(tuple(keys))
+    if store is None or not set(values) <= set(store.values):
+        return None
+    return {stat: frame[list(values)] for stat, frame in store.summary().items()}
+
+
+def group_summary(df, keys, values):
+    """Cached `GroupStats(...).summary()` for `df` (see `GroupStats.summary`)."""
+    key = ("group_stats", frame_token(df), keys if isinstance(keys, str) else tuple(keys or ()), tuple(values))
+
+    def compute():
+        ingested = _from_ingested(df, [keys] if isinstance(keys, str) else list(keys or []), values)
+        if ingested is not None:
+            return ingested
+        source = query_backend.source_for(df, [*([keys] if isinstance(keys, str) else keys or []), *values])
+        if source is not None:
+            return query_backend.group_summary(source, keys, values)
+        return GroupStats.from_frame(df, keys, values).summary()
+
+    return _stores.get_or_compute(key, compute)
+
+
+def overall_summary(df, values):
+    """Whole-frame summary: one row per value column, one column per statistic."""
+    summary = group_summary(df, None, values)
+    return pd.DataFrame({stat: frame.iloc[0] for stat, frame in summary.items()})
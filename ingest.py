@@ -0,0 +1,130 @@
+# ===================================================
+# Chunked ingestion of multi-file, multi-cohort survey data
+# ===================================================
+#
+#   python ingest.py "waves/*.csv" --parquet .cache/all_waves.parquet
+#
+# Cohort CSVs are read `chunksize` rows at a time. Each chunk is normalized
+# (column aliases such as `Sleep_category`), validated against the dataset
+# schema and given the derived columns, then folded into the group summary
+# stores and appended to a Parquet file. Only one chunk is held in memory,
+# so peak memory does not grow with the total number of rows. The Parquet
+# output can be passed straight to `load_dataset()`, and the stores are saved
+# in the artifact store under its version, where `group_stats.group_summary`
+# serves the app's unfiltered summaries from them.
+
+import argparse
+import glob
+from pathlib import Path
+
+import pandas as pd
+
+from cache import ARTIFACTS
+from dataset import SCHEMA, apply_schema, dataset_version, normalize_columns
+from features import derive_features
+from group_stats import GroupStats, ingested_key
+
+CHUNKSIZE = 100_000
+
+SUMMARY_VALUES = ["psqi_2_groups", "Trait_Anxiety", "Start_time_code", "MEQ",
+                  "Daytime_Dozing", "Avg_Weekly_Sleep_Duration"]
+DEFAULT_STORES = {
+    "overall": (None, SUMMARY_VALUES),
+    "Year_of_Study": ("Year_of_Study", SUMMARY_VALUES),
+    "Chronotype": ("Chronotype", SUMMARY_VALUES),
+    "Sex": ("Sex", SUMMARY_VALUES),
+}
+
+
+def resolve_sources(sources):
+    """Expand directories (all *.csv inside) and glob patterns into a sorted file list."""
+    if isinstance(sources, (str, Path)):
+        sources = [sources]
+    paths = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            paths.extend(sorted(source.glob("*.csv")))
+        else:
+            paths.extend(Path(p) for p in sorted(glob.glob(str(source))))
+    if not paths:
+        raise FileNotFoundError(f"No CSV files match {', '.join(map(str, sources))}")
+    return paths
+
+
+def iter_chunks(sources, chunksize=CHUNKSIZE):
+    """Yield (path, chunk) with every chunk normalized, typed and featurized."""
+    for path in resolve_sources(sources):
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield path, derive_features(apply_schema(normalize_columns(chunk)))
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    kinds = {
+        "int": pa.int32(),
+        "float": pa.float32(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(col, kinds[kind]) for col, kind in SCHEMA.items()])
+
+
+def ingest(sources, parquet_path=None, stores=DEFAULT_STORES, chunksize=CHUNKSIZE):
+    """Stream `sources` into GroupStats stores (and optionally one Parquet file).
+
+    Returns ({store name: GroupStats}, total rows).
+    """
+    built = {name: GroupStats(keys, values) for name, (keys, values) in stores.items()}
+    writer = None
+    rows = 0
+    try:
+        for _, chunk in iter_chunks(sources, chunksize):
+            rows += len(chunk)
+            for store in built.values():
+                store.update(chunk)
+            if parquet_path is not None:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                if writer is None:
+                    schema = _arrow_schema()
+                    Path(parquet_path).parent.mkdir(parents=True, exist_ok=True)
+                    writer = pq.ParquetWriter(parquet_path, schema)
+                table = pa.Table.from_pandas(chunk[list(SCHEMA)], preserve_index=False)
+                writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return built, rows
+
+
+def persist_stores(parquet_path, stores):
+    """Save `stores` for the app under the version of `parquet_path`; returns the version."""
+    version = dataset_version(parquet_path)
+    ARTIFACTS.save("group_stores", ingested_key((version, "all")),
+                   {tuple(store.keys): store for store in stores.values()})
+    ARTIFACTS.write_manifest(version, source="ingest.py")
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream cohort CSVs into summary stores and Parquet.")
+    parser.add_argument("sources", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--parquet", help="write all rows to this Parquet file")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    stores, rows = ingest(args.sources, args.parquet, chunksize=args.chunksize)
+    print(f"Ingested {rows:,} rows")
+    if args.parquet:
+        version = persist_stores(args.parquet, stores)
+        print(f"Saved {len(stores)} summary stores for version {version[:16]}")
+    for name, store in stores.items():
+        print(f"\n== {name}")
+        print(pd.DataFrame(store.summary()["mean"]).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
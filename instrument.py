@@ -0,0 +1,150 @@
+# ===================================================
+# Per-section timing and memory instrumentation
+# ===================================================
+#
+#   with section("2.2"):
+#       st.plotly_chart(cached_figure("obj2.2.2", df), use_container_width=True)
+#
+# Profiling is switched on for the whole process with SLEEP_ANXIETY_PROFILE=1
+# or for one browser session with the `?profile=1` query parameter. When it
+# is off, `section()` hands back a shared no-op context manager, so the only
+# cost is that check. When it is on, each section records wall time, CPU
+# time, peak traced allocation (tracemalloc), how far it raised the process's
+# peak RSS and the JSON size of the figures it sent. Records are logged as one JSON object per line on the
+# "sleep_anxiety.profile" logger (stderr, or the file named by
+# SLEEP_ANXIETY_PROFILE_LOG) and listed by `debug_panel()` in the sidebar.
+# CPU time is per thread. Sections are not meant to nest, and allocation
+# peaks overlap when sections run concurrently (progressive.py): each one
+# resets the process-wide tracemalloc peak. Tracing is reference-counted: it
+# starts with the first measured section and stops when the last one ends,
+# so a profiled session does not slow allocation for everyone afterwards.
+
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # Windows: no peak-RSS figures
+    resource = None
+
+ENV_VAR = "SLEEP_ANXIETY_PROFILE"
+LOG_ENV_VAR = "SLEEP_ANXIETY_PROFILE_LOG"  # optional JSON-lines file for the records
+QUERY_PARAM = "profile"
+
+logger = logging.getLogger("sleep_anxiety.profile")
+if not logger.handlers:
+    _handler = logging.FileHandler(os.environ[LOG_ENV_VAR], delay=True) if os.environ.get(LOG_ENV_VAR) else logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_FORCED = os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+_NOOP = contextlib.nullcontext()
+_local = threading.local()  # per script-run thread: records and the open section
+_tracing_lock = threading.Lock()
+_tracing_users = 0          # measured sections currently open
+_tracing_started = False    # whether we (not PYTHONTRACEMALLOC) started tracemalloc
+
+
+def enabled():
+    """True when profiling is on for the process or the current session."""
+    if _FORCED:
+        return True
+    try:
+        return st.query_params.get(QUERY_PARAM) == "1"
+    except Exception:  # outside a Streamlit session (CLI tools, workers)
+        return False
+
+
+def run_records():
+    """The list this script-run thread collects section records in."""
+    if not hasattr(_local, "records"):
+        _local.records = []
+    return _local.records
+
+
+def record_figure(nbytes):
+    """Add `nbytes` of figure JSON to the open section, if any."""
+    current = getattr(_local, "current", None)
+    if current is not None:
+        current["figure_bytes"] += nbytes
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return 0.0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+@contextlib.contextmanager
+def _measure(name, sink):
+    _acquire_tracing()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    record = {"section": name, "figure_bytes": 0}
+    _local.current = record
+    wall, cpu, rss = time.perf_counter(), time.thread_time(), _peak_rss_mb()
+    try:
+        yield record
+    finally:
+        record["wall_ms"] = round((time.perf_counter() - wall) * 1000, 2)
+        record["cpu_ms"] = round((time.thread_time() - cpu) * 1000, 2)
+        record["alloc_peak_kb"] = round((tracemalloc.get_traced_memory()[1] - base) / 1024, 1)
+        record["rss_growth_mb"] = round(_peak_rss_mb() - rss, 1)
+        _release_tracing()
+        _local.current = None
+        sink.append(record)
+        logger.info(json.dumps(record))
+
+
+def section(name, sink=None, profile=None):
+    """Context manager timing the page section `name` (a no-op when disabled).
+
+    Worker threads pass the script thread's `run_records()` as `sink` and its
+    `enabled()` as `profile`, since they have no session of their own.
+    """
+    if not (enabled() if profile is None else profile):
+        return _NOOP
+    return _measure(name, run_records() if sink is None else sink)
+
+
+def debug_panel():
+    """Show this run's section records in the sidebar and start a fresh list."""
+    records, _local.records = run_records(), []
+    if not records or not enabled():
+        return
+    import pandas as pd
+
+    table = pd.DataFrame(records).set_index("section")[["wall_ms", "cpu_ms", "alloc_peak_kb", "rss_growth_mb", "figure_bytes"]]
+    with st.sidebar.expander("Section timings", expanded=False):
+        st.dataframe(table, use_container_width=True)
+        st.caption(f"Total {table['wall_ms'].sum():.0f} ms wall, {table['cpu_ms'].sum():.0f} ms CPU, "
+                   f"{table['figure_bytes'].sum() / 1024:.1f} KiB of figures")
@@ -0,0 +1,168 @@
+# ===================================================
+# Permutation tests for the group differences shown in the charts
+# ===================================================
+#
+# One-way ANOVA (numeric value by group) and chi-square (two categorical
+# columns) p-values are estimated from label permutations. Permutations run
+# in vectorized batches sized to bound memory (`BATCH_ELEMENTS` entries at
+# once), optionally spread across a process pool, and stop early once the
+# p-value estimate is stable: when it is clearly on one side of every
+# conventional threshold or its standard error is small. A permuted
+# contingency table is a draw from the multivariate hypergeometric
+# distribution with the observed margins, so the chi-square test samples
+# tables directly in O(cells) per permutation. Above `ASYMPTOTIC_ROWS` rows
+# both tests use the asymptotic F / chi-square p-value, which is then
+# accurate and keeps filter changes interactive. Results are cached per
+# dataset version and filter.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_token
+
+MAX_PERMUTATIONS = 20_000
+BATCH_ELEMENTS = 2_000_000   # permuted entries held at once (batch x n)
+THRESHOLDS = (0.05, 0.01, 0.001)
+Z = 3.0                      # "clearly on one side" = more than Z standard errors away
+ABS_TOLERANCE = 0.001
+ASYMPTOTIC_ROWS = 50_000
+
+_tests = LRUCache(maxsize=128)
+
+
+def _anova_stat(values, onehot, counts):
+    # With group sizes fixed by the permutation, F is monotone in sum(S_g^2 / n_g)
+    sums = values @ onehot
+    return (sums ** 2 / counts).sum(axis=-1)
+
+
+def _chi2_stat(tables, expected):
+    return ((tables - expected) ** 2 / expected).sum(axis=-1)
+
+
+def _random_tables(rng, row_counts, col_counts, size):
+    """`size` contingency tables (flattened) with the given margins, uniformly over permutations."""
+    ka, kb = len(row_counts), len(col_counts)
+    tables = np.zeros((size, ka, kb), dtype=np.int64)
+    cols_left = np.broadcast_to(np.asarray(col_counts, dtype=np.int64), (size, kb)).copy()
+    for i in range(ka - 1):
+        # Row i takes row_counts[i] items; split them over the columns one
+        # hypergeometric draw at a time
+        need = np.full(size, row_counts[i], dtype=np.int64)
+        others = cols_left.sum(axis=1)
+        for j in range(kb - 1):
+            others = others - cols_left[:, j]
+            draw = rng.hypergeometric(cols_left[:, j], others, need) if need.any() else np.zeros(size, np.int64)
+            tables[:, i, j] = draw
+            need -= draw
+        tables[:, i, kb - 1] = need
+        cols_left -= tables[:, i]
+    tables[:, ka - 1] = cols_left  # the last row gets what is left
+    return tables.reshape(size, ka * kb)
+
+
+def _permutation_batch(kind, arrays, size, seed):
+    rng = np.random.default_rng(seed)
+    if kind == "anova":
+        values, onehot, counts = arrays
+        perms = rng.permuted(np.broadcast_to(values, (size, len(values))), axis=1)
+        return _anova_stat(perms, onehot, counts)
+    row_counts, col_counts, expected = arrays
+    return _chi2_stat(_random_tables(rng, row_counts, col_counts, size), expected)
+
+
+def _stable(hits, total):
+    p = (hits + 1) / (total + 1)
+    se = np.sqrt(p * (1 - p) / total)
+    return se < ABS_TOLERANCE or all(abs(p - t) > Z * se for t in THRESHOLDS)
+
+
+def permutation_pvalue(kind, arrays, observed, max_permutations=MAX_PERMUTATIONS, seed=0, workers=1):
+    """Monte-Carlo p-value P(stat >= observed) with early stopping; returns (p, permutations)."""
+    n = len(arrays[0]) if kind == "anova" else len(arrays[2])  # entries per permutation
+    batch = int(max(1, min(BATCH_ELEMENTS // max(n, 1), max_permutations)))
+    seeds = iter(np.random.SeedSequence(seed).spawn(max_permutations // batch + 1))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    hits = total = 0
+    try:
+        while total < max_permutations:
+            round_sizes = []
+            for _ in range(workers):
+                size = min(batch, max_permutations - total - sum(round_sizes))
+                if size > 0:
+                    round_sizes.append(size)
+            round_seeds = [next(seeds) for _ in round_sizes]
+            if pool is not None:
+                stats = pool.map(_permutation_batch, [kind] * len(round_sizes),
+                                 [arrays] * len(round_sizes), round_sizes, round_seeds)
+            else:
+                stats = [_permutation_batch(kind, arrays, s, sd) for s, sd in zip(round_sizes, round_seeds)]
+            for stat in stats:
+                hits += int((stat >= observed - 1e-12 * abs(observed)).sum())
+            total += sum(round_sizes)
+            if _stable(hits, total):
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return (hits + 1) / (total + 1), total
+
+
+def anova_test(df, value, group, max_permutations=MAX_PERMUTATIONS, seed=0, workers=1):
+    """Permutation one-way ANOVA of `value` across the levels of `group`."""
+    def compute():
+        rows = df[[value, group]].dropna()
+        codes, levels = pd.factorize(rows[group], sort=True)
+        if len(levels) < 2:
+            return None
+        values = rows[value].to_numpy(dtype="float64")
+        values = values - values.mean()
+        onehot = np.eye(len(levels))[codes]
+        counts = onehot.sum(axis=0)
+        observed = _anova_stat(values, onehot, counts)
+
+        n, k = len(values), len(levels)
+        ssb = observed  # between-group SS, since the values are centred
+        sse = (values ** 2).sum() - ssb
+        f_stat = (ssb / (k - 1)) / (sse / (n - k)) if sse > 0 and n > k else np.inf
+        if n > ASYMPTOTIC_ROWS:
+            from scipy.stats import f as f_dist
+
+            return {"method": "ANOVA", "statistic": float(f_stat), "label": "F",
+                    "p_value": float(f_dist.sf(f_stat, k - 1, n - k)), "permutations": 0}
+        p, used = permutation_pvalue("anova", (values, onehot, counts), observed,
+                                     max_permutations, seed, workers)
+        return {"method": "permutation ANOVA", "statistic": float(f_stat), "label": "F",
+                "p_value": p, "permutations": used}
+
+    key = ("anova", frame_token(df), value, group, max_permutations, seed)
+    return _tests.get_or_compute(key, compute)
+
+
+def chi2_test(df, rows_col, cols_col, max_permutations=MAX_PERMUTATIONS, seed=0, workers=1):
+    """Permutation chi-square test of independence between two categorical columns."""
+    def compute():
+        rows = df[[rows_col, cols_col]].dropna()
+        a, a_levels = pd.factorize(rows[rows_col], sort=True)
+        b, b_levels = pd.factorize(rows[cols_col], sort=True)
+        ka, kb = len(a_levels), len(b_levels)
+        if ka < 2 or kb < 2:
+            return None
+        n = len(a)
+        row_counts, col_counts = np.bincount(a, minlength=ka), np.bincount(b, minlength=kb)
+        expected = (row_counts[:, None] * col_counts[None, :] / n).ravel()
+        observed = float(_chi2_stat(np.bincount(a * kb + b, minlength=ka * kb), expected))
+        if n > ASYMPTOTIC_ROWS:
+            from scipy.stats import chi2
+
+            return {"method": "χ² test", "statistic": observed, "label": "χ²",
+                    "p_value": float(chi2.sf(observed, (ka - 1) * (kb - 1))), "permutations": 0}
+        p, used = permutation_pvalue("chi2", (row_counts, col_counts, expected), observed,
+                                     max_permutations, seed, workers)
+        return {"method": "permutation χ²", "statistic": float(observed), "label": "χ²",
+                "p_value": p, "permutations": used}
+
+    key = ("chi2", frame_token(df), rows_col, cols_col, max_permutations, seed)
+    return _tests.get_or_compute(key, compute)
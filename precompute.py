@@ -0,0 +1,105 @@
+# ===================================================
+# Ahead-of-time precompute of every page artifact
+# ===================================================
+#
+#   python precompute.py                      # the default dataset, all cores
+#   python precompute.py --data .cache/all_waves.parquet --workers 4
+#   python precompute.py --data "Wave 2"        # a name from datasets.json
+#
+# Builds every registered figure spec (figures.FIGURES) and every metric the
+# pages show for the unfiltered dataset, spread over a process pool. Results
+# are written through the persistent caches into the artifact store
+# (.cache/artifacts/<version>-<code>/...), which the app reads on a cache
+# miss, so the first visit after a deploy does not compute anything. The
+# manifest written at the end marks the directory as complete; the app ignores
+# directories without one, and any built by different code. Filtered views
+# are still computed on demand.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bootstrap import correlation_cis, mean_difference_cis
+from cache import ARTIFACTS, version_dir
+from dataset import DATA_FILE, load_dataset
+from figures import FIGURES, figure_spec
+from group_stats import overall_summary
+from registry import path_for
+from sampling import sample_points
+from stats_engine import pearson
+
+# Metric calls made by the pages outside figures.py; keep the arguments
+# identical to the page code so the cache keys match.
+METRICS = {
+    "home.sample_points": lambda df: sample_points(df, None, "Trait_Anxiety"),
+    "home.mean_difference": lambda df: mean_difference_cis(df, "Trait_Anxiety", "Sleep_Category"),
+    "obj1.summary": lambda df: overall_summary(df, ["psqi_2_groups", "Trait_Anxiety"]),
+    "obj1.sample_points": lambda df: sample_points(df, "Year_of_Study", "Trait_Anxiety"),
+    "obj1.mean_difference": lambda df: mean_difference_cis(df, "Trait_Anxiety", "Year_of_Study"),
+    "obj2.pearson": lambda df: pearson(df, "psqi_2_groups", "Trait_Anxiety"),
+    "obj2.correlation_cis": lambda df: correlation_cis(df, "psqi_2_groups", "Trait_Anxiety"),
+    "obj2.sample_points": lambda df: sample_points(df, "Chronotype", "Trait_Anxiety"),
+    "obj3.summary": lambda df: overall_summary(df, ["Start_time_code", "psqi_2_groups"]),
+    "obj3.sample_points": lambda df: sample_points(df, "Chronotype", "Start_time_code"),
+}
+
+_df = None  # per-worker dataset, loaded once by `_init_worker`
+
+
+def _init_worker(path):
+    global _df
+    ARTIFACTS.writable = True
+    _df = load_dataset(path)
+
+
+def _run(task):
+    start = time.perf_counter()
+    if task in FIGURES:
+        figure_spec(task, _df)
+    else:
+        METRICS[task](_df)
+    return task, time.perf_counter() - start
+
+
+def precompute(path=DATA_FILE, workers=None, tasks=None):
+    """Materialize `tasks` (default: every figure and metric); returns {task: seconds}."""
+    tasks = list(tasks or [*FIGURES, *METRICS])
+    workers = workers or os.cpu_count() or 1
+    timings = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(str(path),)) as pool:
+        futures = [pool.submit(_run, task) for task in tasks]
+        for future in as_completed(futures):
+            task, seconds = future.result()
+            timings[task] = seconds
+            print(f"  {task:24s} {seconds:8.2f} s")
+    version = load_dataset(path).attrs["dataset_version"]
+    ARTIFACTS.write_manifest(version, tasks=sorted(timings), created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute all page figures and metrics into the artifact store.")
+    parser.add_argument("--data", default=str(DATA_FILE), help="registered dataset name or file (CSV or Parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("tasks", nargs="*", help="figure ids or metric names (default: all)")
+    args = parser.parse_args(argv)
+
+    unknown = [t for t in args.tasks if t not in FIGURES and t not in METRICS]
+    if unknown:
+        parser.error(f"unknown tasks: {', '.join(unknown)}")
+
+    path = path_for(args.data)
+    version = load_dataset(path).attrs["dataset_version"]
+    print(f"Precomputing {version[:16]} into {ARTIFACTS.root / version_dir(version)}")
+    start = time.perf_counter()
+    timings = precompute(path, args.workers, args.tasks)
+    print(f"{len(timings)} artifacts in {time.perf_counter() - start:.1f} s "
+          f"(sum of task times {sum(timings.values()):.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
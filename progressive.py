@@ -0,0 +1,145 @@
+# ===================================================
+# Progressive rendering: compute sections concurrently, draw as they finish
+# ===================================================
+#
+#   page = ProgressivePage()
+#   page.submit("2.1", lambda: cached_figure("obj2.2.1", df))
+#   ...
+#   st.title("2.1. ...")
+#   page.slot("2.1", lambda fig: st.plotly_chart(fig, use_container_width=True))
+#   ...
+#   page.fill()
+#
+# Section computations are submitted to a process-wide thread pool before the
+# page is laid out. The layout code then reserves an `st.empty` placeholder
+# for each section, and `fill()` draws each section into its placeholder as
+# soon as its result is ready, in completion order. Page latency approaches
+# the slowest section instead of the sum of all of them. Threads (not
+# processes) share the in-process caches, so a cached section completes
+# immediately. Only the computation runs off the script thread; every
+# Streamlit call happens in `slot()`/`fill()`.
+#
+# The pool is shared by every session, so each page hands at most
+# `MAX_SECTIONS_PER_SESSION` sections to it at a time and queues the rest.
+# A new run of the same session (e.g. after a filter change) cancels the
+# queued sections of the run it replaces, as does an exception in `fill()`;
+# sections already running finish and land in the caches, and count against
+# the session's bound until they do.
+
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import streamlit as st
+
+from instrument import enabled, run_records, section
+
+MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+MAX_SECTIONS_PER_SESSION = max(2, MAX_WORKERS // 2)
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="section")
+_latest = weakref.WeakValueDictionary()  # session id -> its most recent ProgressivePage
+_latest_lock = threading.Lock()
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+class ProgressivePage:
+    """Sections of one script run, computed on the shared pool."""
+
+    def __init__(self, max_in_flight=MAX_SECTIONS_PER_SESSION):
+        self.futures = {}
+        self.slots = {}
+        self.max_in_flight = max_in_flight
+        self._queue = deque()  # (name, compute, future) not yet handed to the pool
+        self._running = 0
+        self._lock = threading.Lock()
+        self._previous = None   # the session's replaced run, while its sections still run
+        self._successor = None
+        # Captured on the script thread; workers have no session to ask
+        self._profile = enabled()
+        self._sink = run_records()
+
+        session = _session_id()
+        if session is not None:
+            with _latest_lock:
+                previous, _latest[session] = _latest.get(session), self
+            if previous is not None:
+                previous.cancel()
+                previous._successor, self._previous = self, previous
+
+    def _run(self, name, compute):
+        with section(name, sink=self._sink, profile=self._profile):
+            return compute()
+
+    def _in_flight(self):
+        # Sections of replaced runs keep their workers until done; they count
+        # against the session's bound too
+        previous = self._previous
+        if previous is not None and previous._in_flight() == 0:
+            self._previous = previous = None
+        return self._running + (previous._in_flight() if previous is not None else 0)
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._queue and self._in_flight() < self.max_in_flight:
+                name, compute, future = self._queue.popleft()
+                if future.set_running_or_notify_cancel():
+                    self._running += 1
+                    started.append((name, compute, future))
+        for name, compute, future in started:
+            _pool.submit(self._run, name, compute).add_done_callback(
+                lambda done, future=future: self._finished(future, done))
+
+    def _finished(self, future, done):
+        with self._lock:
+            self._running -= 1
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+        self._dispatch()
+        if self._successor is not None:
+            self._successor._dispatch()
+
+    def submit(self, name, compute):
+        """Queue section `name` for computing; `compute()` must not call Streamlit."""
+        future = Future()
+        self.futures[name] = future
+        with self._lock:
+            self._queue.append((name, compute, future))
+        self._dispatch()
+
+    def cancel(self):
+        """Drop every section that has not started yet."""
+        for future in self.futures.values():
+            future.cancel()
+
+    def slot(self, name, render, message=None):
+        """Reserve the place where `render(result)` will draw section `name`."""
+        placeholder = st.empty()
+        placeholder.caption(message or f"Computing section {name}…")
+        self.slots[name] = (placeholder, render)
+
+    def fill(self):
+        """Draw every slotted section as its result completes."""
+        pending = {self.futures[name]: name for name in self.slots}
+        try:
+            for future in as_completed(pending):
+                if future.cancelled():
+                    continue  # replaced by a newer run of this session
+                placeholder, render = self.slots[pending[future]]
+                with placeholder.container():
+                    render(future.result())
+        except BaseException:
+            # Rerun/stop requests and render errors: nothing left is needed
+            self.cancel()
+            raise
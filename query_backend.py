@@ -0,0 +1,183 @@
+# ===================================================
+# Out-of-core aggregate queries over the dataset files
+# ===================================================
+#
+# Aggregate-only chart inputs (crosstab counts, per-group summaries) can be
+# answered straight from the Parquet/CSV file by an embedded engine, which
+# scans only the referenced columns and returns just the small aggregated
+# frame. DuckDB is used when installed, otherwise pyarrow (column-
+# pruned scan plus Table.group_by). aggregate.py and group_stats.py route
+# through here for unfiltered, file-backed frames whose columns exist in the
+# file; everything else stays on the in-memory pandas path.
+#
+# SLEEP_ANXIETY_QUERY_BACKEND=duckdb|arrow|pandas forces an engine ("pandas"
+# turns the backend off).
+
+import importlib.util
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from dataset import dataset_version
+
+# Both engines are optional and imported on first query, keeping them out of
+# the pages' startup imports
+HAS_DUCKDB = importlib.util.find_spec("duckdb") is not None
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+ENV_VAR = "SLEEP_ANXIETY_QUERY_BACKEND"
+
+_local = threading.local()  # one DuckDB connection per thread
+_schemas = {}               # (path, content hash) -> column names in the file
+
+
+def engine():
+    """Name of the engine in use: "duckdb", "arrow" or None (pandas only)."""
+    forced = os.environ.get(ENV_VAR, "").lower()
+    if forced == "pandas":
+        return None
+    if forced in ("", "duckdb") and HAS_DUCKDB:
+        return "duckdb"
+    if forced in ("", "arrow") and HAS_ARROW:
+        return "arrow"
+    return None
+
+
+def _format(path):
+    return "parquet" if str(path).endswith(".parquet") else "csv"
+
+
+def _columns(path, version):
+    # Keyed by content too: a rewritten file may have renamed or dropped columns
+    key = (str(path), version)
+    if key not in _schemas:
+        if _format(path) == "parquet":
+            import pyarrow.parquet as pq
+
+            _schemas[key] = set(pq.read_schema(key[0]).names)
+        else:
+            _schemas[key] = set(pd.read_csv(key[0], nrows=0).columns)
+    return _schemas[key]
+
+
+def source_for(df, columns):
+    """The file behind `df` if it can answer queries on `columns`, else None.
+
+    Only unfiltered frames loaded from a local file qualify, only while the
+    file still holds the version the frame was loaded from, and only when
+    every column is stored in the file (derived columns are not).
+    """
+    path = df.attrs.get("dataset_path")
+    if path is None or df.attrs.get("filter_key", "all") != "all" or engine() is None:
+        return None
+    version = df.attrs.get("dataset_version")
+    if not Path(path).exists() or dataset_version(path) != version:
+        return None
+    if not set(columns) <= _columns(path, version):
+        return None
+    return path
+
+
+# ---------------------------------------------------
+# DuckDB
+# ---------------------------------------------------
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql(path, query):
+    if not hasattr(_local, "conn"):
+        import duckdb
+
+        _local.conn = duckdb.connect()
+    reader = "read_parquet" if _format(path) == "parquet" else "read_csv_auto"
+    relation = "{}('{}')".format(reader, str(path).replace("'", "''"))
+    return _local.conn.execute(query.format(src=relation)).df()
+
+
+def _duckdb_crosstab(path, rows, cols, name):
+    r, c = _quote(rows), _quote(cols)
+    return _sql(path, f"SELECT {r}, {c}, count(*) AS {_quote(name)} FROM {{src}} "
+                      f"WHERE {r} IS NOT NULL AND {c} IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2")
+
+
+def _duckdb_summary(path, keys, values):
+    aggs = ", ".join(
+        f"count({v}) AS {_quote('count|' + name)}, avg({v}) AS {_quote('mean|' + name)}, "
+        f"var_samp({v}) AS {_quote('var|' + name)}, stddev_samp({v}) AS {_quote('std|' + name)}, "
+        f"min({v}) AS {_quote('min|' + name)}, max({v}) AS {_quote('max|' + name)}"
+        for name in values for v in [f"CAST({_quote(name)} AS DOUBLE)"]
+    )
+    if not keys:
+        return _sql(path, f"SELECT {aggs} FROM {{src}}")
+    key_list = ", ".join(map(_quote, keys))
+    where = " AND ".join(f"{_quote(k)} IS NOT NULL" for k in keys)
+    return _sql(path, f"SELECT {key_list}, {aggs} FROM {{src}} WHERE {where} "
+                      f"GROUP BY {key_list} ORDER BY {key_list}")
+
+
+# ---------------------------------------------------
+# pyarrow
+# ---------------------------------------------------
+def _arrow_table(path, columns):
+    import pyarrow.dataset as pa_dataset
+
+    return pa_dataset.dataset(str(path), format=_format(path)).to_table(columns=list(columns))
+
+
+def _arrow_crosstab(path, rows, cols, name):
+    table = _arrow_table(path, [rows, cols]).drop_null()
+    out = table.group_by([rows, cols]).aggregate([([], "count_all")]).to_pandas()
+    return out.rename(columns={"count_all": name}).sort_values([rows, cols], ignore_index=True)
+
+
+def _arrow_summary(path, keys, values):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = _arrow_table(path, [*keys, *values])
+    for key in keys:
+        table = table.filter(pc.is_valid(table[key]))
+    group = keys or ["__all"]
+    if not keys:
+        table = table.append_column("__all", pa.array(np.zeros(len(table), dtype=np.int8)))
+
+    ddof1 = pc.VarianceOptions(ddof=1)
+    functions = {"count": ("count", None), "mean": ("mean", None), "var": ("variance", ddof1),
+                 "std": ("stddev", ddof1), "min": ("min", None), "max": ("max", None)}
+    out = table.group_by(group).aggregate(
+        [(name, fn, opts) for name in values for fn, opts in functions.values()]
+    ).to_pandas()
+    flat = pd.DataFrame({key: out[key] for key in keys})
+    for name in values:
+        for stat, (fn, _) in functions.items():
+            flat[f"{stat}|{name}"] = out[f"{name}_{fn}"]
+    return flat.sort_values(keys, ignore_index=True) if keys else flat
+
+
+# ---------------------------------------------------
+# Public queries
+# ---------------------------------------------------
+def crosstab(path, rows, cols, name="Count"):
+    """Long-format counts of every observed (`rows`, `cols`) combination."""
+    if engine() == "duckdb":
+        return _duckdb_crosstab(path, rows, cols, name)
+    return _arrow_crosstab(path, rows, cols, name)
+
+
+def group_summary(path, keys, values):
+    """stat -> DataFrame (groups x values), as `group_stats.GroupStats.summary()`."""
+    keys = [keys] if isinstance(keys, str) else list(keys or [])
+    flat = (_duckdb_summary if engine() == "duckdb" else _arrow_summary)(path, keys, values)
+    if keys:
+        index = pd.MultiIndex.from_frame(flat[keys]) if len(keys) > 1 else pd.Index(flat[keys[0]], name=keys[0])
+    else:
+        index = pd.RangeIndex(1)
+    return {
+        stat: pd.DataFrame({name: flat[f"{stat}|{name}"].to_numpy(dtype="float64") for name in values}, index=index)
+        for stat in ("count", "mean", "var", "std", "min", "max")
+    }
+
@@ -0,0 +1,167 @@
+# ===================================================
+# Named datasets: registry, UI selector and CLI
+# ===================================================
+#
+#   python registry.py list                       # names, files, content hashes
+#   python registry.py add "Wave 2" waves/2019.parquet --description "2019 survey wave"
+#   python registry.py verify                     # files changed since registration?
+#   python registry.py prune                      # drop artifacts of unregistered versions
+#
+# datasets.json maps a display name to a local file (CSV or Parquet), an
+# optional download URL used when the file is missing, and the SHA-256 the
+# file had when it was registered. The hash on record is informational; the
+# app always keys its caches by the hash of the content it actually reads
+# (dataset.dataset_version), so an edited file is picked up, and the caches of
+# its previous content evicted, on the next rerun. SLEEP_ANXIETY_DATA still
+# points every page at a single file and bypasses the registry.
+
+import argparse
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+from dataset import DATA_FILE, DATA_URL, dataset_version, load_dataset
+
+REGISTRY_FILE = Path(__file__).with_name("datasets.json")
+DEFAULT_NAME = "Norbury & Evans 2018"
+
+_lock = threading.Lock()
+_loaded = {}  # (mtime_ns, size) of REGISTRY_FILE -> parsed entries
+
+
+def _default():
+    return {DEFAULT_NAME: {"path": str(DATA_FILE), "url": DATA_URL}}
+
+
+def _resolve(entry):
+    path = Path(entry["path"])
+    if not path.is_absolute():
+        path = REGISTRY_FILE.parent / path
+    return {**entry, "path": path}
+
+
+def datasets():
+    """{name: entry} in registration order; entry["path"] is an absolute Path."""
+    if os.environ.get("SLEEP_ANXIETY_DATA") or not REGISTRY_FILE.exists():
+        return {name: _resolve(entry) for name, entry in _default().items()}
+    st_ = REGISTRY_FILE.stat()
+    stamp = (st_.st_mtime_ns, st_.st_size)
+    with _lock:
+        if stamp not in _loaded:
+            raw = json.loads(REGISTRY_FILE.read_text(encoding="utf-8"))
+            _loaded.clear()
+            _loaded[stamp] = {name: _resolve(entry) for name, entry in raw.items()}
+        return _loaded[stamp]
+
+
+def path_for(name_or_path):
+    """File behind a registered name; anything else is taken as a path."""
+    entry = datasets().get(name_or_path)
+    return entry["path"] if entry is not None else Path(name_or_path)
+
+
+def output_name(path):
+    """Name for files derived from `path`: its registered name, else the file stem."""
+    path = Path(path).resolve()
+    for name, entry in datasets().items():
+        if entry["path"].resolve() == path:
+            return name.replace("/", "-")
+    return path.stem
+
+
+def load(name=None):
+    """The frame of dataset `name` (default: the first registered one)."""
+    entries = datasets()
+    entry = entries[name] if name is not None else next(iter(entries.values()))
+    return load_dataset(entry["path"], url_fallback=entry.get("url"))
+
+
+def select_dataset():
+    """Sidebar dataset picker; returns the chosen dataset's frame."""
+    import streamlit as st
+
+    names = list(datasets())
+    if len(names) == 1:
+        return load(names[0])
+    name = st.sidebar.selectbox("Dataset", names, key="dataset")
+    df = load(name)
+    st.sidebar.caption(f"Version {df.attrs['dataset_version'][:12]}")
+    return df
+
+
+# ---------------------------------------------------
+# CLI
+# ---------------------------------------------------
+def _save(entries):
+    raw = {}
+    for name, entry in entries.items():
+        path = Path(entry["path"])
+        try:
+            path = path.relative_to(REGISTRY_FILE.parent)
+        except ValueError:
+            pass
+        raw[name] = {**entry, "path": path.as_posix()}
+    REGISTRY_FILE.write_text(json.dumps(raw, indent=2) + "\n", encoding="utf-8")
+
+
+def _live_version(entry):
+    return dataset_version(entry["path"]) if entry["path"].exists() else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the named datasets shown in the dashboard.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show registered datasets and their content hashes")
+    add = commands.add_parser("add", help="register (or re-register) a dataset file")
+    add.add_argument("name")
+    add.add_argument("path")
+    add.add_argument("--url", help="download URL used when the file is missing")
+    add.add_argument("--description", default="")
+    remove = commands.add_parser("remove", help="unregister a dataset")
+    remove.add_argument("name")
+    commands.add_parser("verify", help="compare each file with the hash it was registered with")
+    commands.add_parser("prune", help="delete stored artifacts of versions no longer registered")
+    args = parser.parse_args(argv)
+
+    entries = dict(datasets())
+    if args.command == "list":
+        for name, entry in entries.items():
+            version = _live_version(entry)
+            print(f"{name:28s} {(version or 'missing')[:16]:16s} {entry['path']}")
+    elif args.command == "add":
+        path = Path(args.path).resolve()
+        if not path.exists():
+            parser.error(f"Dataset not found: {path}")
+        load_dataset(path, url_fallback=None)  # validates against the schema
+        entry = {"path": str(path), "sha256": dataset_version(path), "description": args.description}
+        if args.url:
+            entry["url"] = args.url
+        entries[args.name] = entry
+        _save(entries)
+        print(f"Registered {args.name!r} at {entry['sha256'][:16]}")
+    elif args.command == "remove":
+        if entries.pop(args.name, None) is None:
+            parser.error(f"Unknown dataset {args.name!r}")
+        _save(entries)
+    elif args.command == "verify":
+        changed = 0
+        for name, entry in entries.items():
+            version = _live_version(entry)
+            recorded = entry.get("sha256")
+            status = "missing" if version is None else "ok" if recorded in (None, version) else "changed"
+            changed += status != "ok"
+            print(f"{name:28s} {status}")
+        return 1 if changed else 0
+    elif args.command == "prune":
+        from cache import ARTIFACTS
+
+        keep = [v for v in map(_live_version, entries.values()) if v is not None]
+        for removed in ARTIFACTS.prune(keep):
+            print(f"  removed {removed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# ===================================================
+# Point budget for charts that draw one marker per respondent
+# ===================================================
+#
+# Box/violin plots with points='all' and the scatter plots draw every row.
+# Above `POINT_BUDGET` rows the pages plot a stratified sample instead: each
+# group keeps its share of the budget, and box-plot outliers are kept up to
+# `OUTLIER_SHARE` of it. The boxes and violins themselves are drawn from
+# full-data statistics (`box_stats`, density.group_densities), never from the
+# sampled markers, so the visible spread is unchanged. Fitted lines and
+# metrics still use all rows.
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_token
+
+POINT_BUDGET = 5000
+OUTLIER_SHARE = 0.1  # at most this share of the budget goes to outliers
+
+_samples = LRUCache(maxsize=64, persist="sampling")
+
+
+def _outliers(values, groups):
+    quartiles = values.groupby(groups, observed=True).quantile([0.25, 0.75]).unstack()
+    q1 = groups.map(quartiles[0.25]).astype("float64")
+    q3 = groups.map(quartiles[0.75]).astype("float64")
+    iqr = q3 - q1
+    return (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+
+
+def box_stats(df, by, value_col):
+    """Tukey box statistics of `value_col` per `by` group, from every row.
+
+    One row per group (sorted) with q1, median, q3, lowerfence/upperfence
+    (the most extreme values within 1.5 IQR, as Plotly draws them), mean
+    and count; `by=None` gives a single group 0.
+    """
+    def compute():
+        values = df[value_col].astype("float64")
+        groups = df[by] if by is not None else pd.Series(0, index=df.index)
+        valid = values.notna() & groups.notna()
+        values, groups = values[valid], groups[valid]
+        grouped = values.groupby(groups, observed=True)
+        stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+        stats.columns = ["q1", "median", "q3"]
+        iqr = stats["q3"] - stats["q1"]
+        low = groups.map(stats["q1"] - 1.5 * iqr).astype("float64")
+        high = groups.map(stats["q3"] + 1.5 * iqr).astype("float64")
+        stats["lowerfence"] = values.where(values >= low).groupby(groups, observed=True).min()
+        stats["upperfence"] = values.where(values <= high).groupby(groups, observed=True).max()
+        stats["mean"] = grouped.mean()
+        stats["count"] = grouped.size()
+        return stats.sort_index()
+
+    return _samples.get_or_compute(("box", frame_token(df), by, value_col), compute)
+
+
+def stratified_sample(df, by, value_col, budget=POINT_BUDGET, seed=0):
+    """Return at most `budget` rows of `df`, proportional per `by` group.
+
+    Outliers are kept first, but only up to `OUTLIER_SHARE` of the budget.
+    Rows missing the value or the group cannot be drawn and are never kept.
+    """
+    def compute():
+        rng = np.random.default_rng(seed)
+        # float64 turns nullable-integer NA into NaN, so comparisons stay boolean
+        values = df[value_col].astype("float64")
+        groups = df[by] if by is not None else pd.Series(0, index=df.index)
+        valid = (values.notna() & groups.notna()).to_numpy()
+        values, groups = values[valid], groups[valid]
+
+        outlier = _outliers(values, groups).to_numpy(dtype=bool)
+        keep = outlier.copy()
+        outlier_budget = int(budget * OUTLIER_SHARE)
+        if keep.sum() > outlier_budget:
+            keep[rng.permutation(np.flatnonzero(keep))[outlier_budget:]] = False
+
+        # The rest of the budget samples the non-outliers only
+        remaining = budget - int(keep.sum())
+        rest = ~outlier
+        rest_groups = groups[rest]
+        share = rest_groups.value_counts() / max(int(rest.sum()), 1)
+        quota = np.floor(share * remaining).astype("int64")
+        # Random order within each group; keep the first `quota` rows of each
+        order = pd.Series(rng.random(int(rest.sum())), index=rest_groups.index)
+        rank = order.groupby(rest_groups, observed=True).rank(method="first")
+        keep[rest] = (rank <= rest_groups.map(quota).astype("float64").fillna(0)).to_numpy()
+        rows = np.flatnonzero(valid)[keep]
+        return df.iloc[rows]
+
+    key = ("stratified", frame_token(df), tuple(df.columns), by, value_col, budget, seed)
+    return _samples.get_or_compute(key, compute)
+
+
+def sample_points(df, by, value_col, budget=POINT_BUDGET):
+    """Rows to draw as markers plus a "showing N of M" note (None when nothing was dropped)."""
+    if len(df) <= budget:
+        return df, None
+    sample = stratified_sample(df, by, value_col, budget)
+    note = f"Showing {len(sample):,} of {len(df):,} respondents as points (stratified sample"
+    note += f" by {by})" if by is not None else ")"
+    note += "; boxes and summary statistics use every respondent."
+    return sample, note
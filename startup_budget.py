@@ -0,0 +1,97 @@
+# ===================================================
+# Cold-start import report and budget check for the dashboard pages
+# ===================================================
+#
+#   python startup_budget.py            # report, fail if a page is over budget
+#   python startup_budget.py --update   # record current cost (+ headroom) as the budget
+#
+# The check also runs with the test suite (tests/test_startup_budget.py).
+#
+# Each page's leading import block (everything a page imports before it can
+# render its first element) is run in a fresh interpreter under
+# `python -X importtime`; the best of several runs is compared with the
+# per-page budget in startup_budget.json. Imports placed inside a section are
+# deliberately excluded: they are paid only when that section runs.
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+PAGES = ["Homepage.py", "Objectives1.py", "Objectives2.py", "Objectives3.py"]
+BUDGET_FILE = ROOT / "startup_budget.json"
+HEADROOM = 1.5
+
+
+def leading_imports(page):
+    """Source of the import statements at the top of `page`, up to the first other statement."""
+    tree = ast.parse((ROOT / page).read_text(encoding="utf-8"))
+    imports = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(ast.unparse(node))
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # module docstring
+        else:
+            break
+    return "\n".join(imports)
+
+
+def measure(code):
+    """Run `code` under -X importtime; return (total_ms, {top-level module: cumulative_ms})."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    top = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        total_us += int(self_us)
+        if not name[1:].startswith(" "):  # imported directly by the page
+            top[name.strip()] = int(cumulative_us) / 1000
+    return total_us / 1000, top
+
+
+def report(runs=3, top_n=8):
+    results = {}
+    for page in PAGES:
+        code = leading_imports(page)
+        samples = [measure(code) for _ in range(runs)]
+        total, top = min(samples, key=lambda sample: sample[0])
+        results[page] = total
+        print(f"{page}: {total:.0f} ms")
+        for name, ms in sorted(top.items(), key=lambda item: -item[1])[:top_n]:
+            print(f"    {ms:8.1f} ms  {name}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check dashboard page import times against the budget.")
+    parser.add_argument("--update", action="store_true", help="rewrite the budget from this run")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per page (best is kept)")
+    args = parser.parse_args(argv)
+
+    results = report(args.runs)
+    if args.update:
+        budget = {page: round(ms * HEADROOM) for page, ms in results.items()}
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n", encoding="utf-8")
+        print(f"Budget written to {BUDGET_FILE.name}")
+        return 0
+
+    budget = json.loads(BUDGET_FILE.read_text(encoding="utf-8"))
+    over = {page: ms for page, ms in results.items() if ms > budget.get(page, float("inf"))}
+    for page, ms in over.items():
+        print(f"OVER BUDGET: {page} imports take {ms:.0f} ms (budget {budget[page]} ms)")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# ===================================================
+# Memoized statistics shared by the dashboard pages
+# ===================================================
+#
+# Results are cached per (dataset version, filter, columns) so the same
+# correlation or regression is computed once, not on every page rerun.
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_token
+
+_results = LRUCache(maxsize=256, persist="stats")
+
+
+def _paired(df, x, y):
+    # Keep only rows where both columns are present so the pairs stay aligned
+    return df[[x, y]].dropna().astype("float64")
+
+
+def pearson(df, x, y):
+    """Pearson r and two-sided p-value over rows where both `x` and `y` are present."""
+    def compute():
+        from scipy import stats
+
+        pairs = _paired(df, x, y)
+        if len(pairs) < 2:
+            return np.nan, np.nan  # e.g. a one-respondent cohort, as in linear_fits
+        r, p = stats.pearsonr(pairs[x], pairs[y])
+        return float(r), float(p)
+
+    return _results.get_or_compute(("pearson", frame_token(df), x, y), compute)
+
+
+def linear_fits(df, x, y, by=None):
+    """Closed-form least-squares fit of `y` on `x`, optionally per group of `by`.
+
+    Returns a frame indexed by group (a single "all" row when `by` is None)
+    with n, slope, intercept, r_squared, p_value, x_min and x_max. Every
+    group is fitted from the same groupby sums, so the cost is one pass over
+    the rows regardless of the number of groups.
+    """
+    def compute():
+        from scipy import special
+
+        cols = [x, y] if by is None else [x, y, by]
+        pairs = df[cols].dropna(subset=[x, y])
+        xs = pairs[x].astype("float64")
+        ys = pairs[y].astype("float64")
+        # Centre on the overall means first to keep the sums well conditioned
+        x_mean, y_mean = xs.mean(), ys.mean()
+        dx, dy = xs - x_mean, ys - y_mean
+        keys = pairs[by] if by is not None else np.zeros(len(pairs), dtype=np.int8)
+        sums = pd.DataFrame({
+            "x": dx, "y": dy, "xx": dx * dx, "xy": dx * dy, "yy": dy * dy,
+        }).groupby(keys, observed=True).sum()
+        grouped = xs.groupby(keys, observed=True)
+        n = grouped.size().astype("float64")
+
+        sxx = sums["xx"] - sums["x"] ** 2 / n
+        sxy = sums["xy"] - sums["x"] * sums["y"] / n
+        syy = sums["yy"] - sums["y"] ** 2 / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = sxy / sxx
+            intercept = (y_mean + sums["y"] / n) - slope * (x_mean + sums["x"] / n)
+            r_squared = sxy ** 2 / (sxx * syy)
+            dof = n - 2
+            t = np.sqrt(r_squared * dof / (1 - r_squared))
+            p_value = 2 * special.stdtr(dof, -np.abs(t))
+        p_value = p_value.where(dof > 0)
+
+        fits = pd.DataFrame({
+            "n": n.astype("int64"),
+            "slope": slope,
+            "intercept": intercept,
+            "r_squared": r_squared,
+            "p_value": p_value,
+            "x_min": grouped.min(),
+            "x_max": grouped.max(),
+        })
+        if by is None:
+            fits.index = ["all"]
+        return fits
+
+    return _results.get_or_compute(("fits", frame_token(df), x, y, by), compute)
+
+
+def ols(df, x, y):
+    """Simple OLS fit of `y` on `x`; returns slope, intercept, R² and the slope p-value."""
+    fit = linear_fits(df, x, y).iloc[0]
+    return {
+        "slope": float(fit["slope"]),
+        "intercept": float(fit["intercept"]),
+        "r_squared": float(fit["r_squared"]),
+        "p_value": float(fit["p_value"]),
+        "n": int(fit["n"]),
+    }
+
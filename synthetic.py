@@ -0,0 +1,196 @@
+# ===================================================
+# Synthetic survey data at arbitrary scale
+# ===================================================
+#
+#   python synthetic.py 100000000 .cache/synthetic-100M.parquet --seed 7
+#
+# A Gaussian copula is fitted to the real survey: every modelled column keeps
+# its empirical marginal (sorted sample used as the quantile function) and
+# the columns are tied together by the correlation of their normal scores, so
+# pairs such as psqi_2_groups/Trait_Anxiety, MEQ/Start_time_code and
+# Daytime_Dozing keep their dependence. Ties in discrete columns (binary
+# psqi_2_groups in particular) weaken the dependence that survives sampling,
+# so the latent correlation is calibrated on a few simulated samples until
+# the synthetic normal-score correlations match the real ones. Columns that are functions of others
+# in the real file (Start_time, Daytime_Dozing_Groups) are looked up from
+# their source column rather than sampled.
+#
+# Rows are drawn in fixed-size vectorized batches and appended to the CSV or
+# Parquet output, so memory stays flat in the number of rows. Batch i is
+# seeded from SeedSequence(seed).spawn, so output is reproducible per seed.
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import DATA_FILE, SCHEMA, apply_schema, normalize_columns
+
+BATCH_ROWS = 1_000_000
+CALIBRATION_ROWS = 50_000
+CALIBRATION_ROUNDS = 3
+
+# Columns derived from sampled ones (or written as row ids) instead of modelled
+DERIVED = ("Case_Number", "Start_time", "Daytime_Dozing_Groups")
+KEY_PAIRS = [("psqi_2_groups", "Trait_Anxiety"), ("MEQ", "Start_time_code"),
+             ("Daytime_Dozing", "Trait_Anxiety"), ("Daytime_Dozing", "psqi_2_groups")]
+
+
+def _normal_scores(values):
+    from scipy.special import ndtri
+    from scipy.stats import rankdata
+
+    return ndtri((rankdata(values) - 0.5) / len(values))
+
+
+def _nearest_correlation(corr):
+    # Clip negative eigenvalues so the Cholesky factor exists
+    w, v = np.linalg.eigh(corr)
+    fixed = (v * np.clip(w, 1e-6, None)) @ v.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+
+class CopulaModel:
+    """Gaussian copula with empirical marginals for the survey schema."""
+
+    def __init__(self, columns, marginals, categories, factor, lookups):
+        self.columns = columns        # modelled columns, in copula order
+        self.marginals = marginals    # column -> sorted sample (codes for categoricals)
+        self.categories = categories  # categorical column -> category labels
+        self.factor = factor          # Cholesky factor of the normal-score correlation
+        self.lookups = lookups        # derived column -> (source column, {value: label})
+
+    @classmethod
+    def fit(cls, df):
+        df = apply_schema(normalize_columns(df))[list(SCHEMA)]
+        columns = [col for col in SCHEMA if col not in DERIVED]
+        marginals, categories, scores = {}, {}, []
+        for col in columns:
+            values = df[col]
+            if SCHEMA[col] == "category":
+                categories[col] = list(values.cat.categories)
+                values = values.cat.codes
+            values = values.to_numpy(dtype="float64")
+            marginals[col] = np.sort(values)
+            scores.append(_normal_scores(values))
+        target = np.corrcoef(np.vstack(scores))
+        lookups = {
+            "Start_time": ("Start_time_code", df.groupby("Start_time_code", observed=True)["Start_time"]
+                           .agg(lambda s: s.mode().iloc[0]).astype(str).to_dict()),
+            "Daytime_Dozing_Groups": ("Daytime_Dozing", df.groupby("Daytime_Dozing")["Daytime_Dozing_Groups"]
+                                      .agg(lambda s: s.mode().iloc[0]).to_dict()),
+        }
+        model = cls(columns, marginals, categories, np.linalg.cholesky(_nearest_correlation(target)), lookups)
+        model._calibrate(target)
+        return model
+
+    def _draw(self, rows, rng):
+        from scipy.special import ndtr
+
+        u = ndtr(rng.standard_normal((rows, len(self.columns))) @ self.factor.T)
+        return np.column_stack([self._quantile(col, u[:, j]) for j, col in enumerate(self.columns)])
+
+    def _calibrate(self, target, rounds=CALIBRATION_ROUNDS, rows=CALIBRATION_ROWS):
+        latent = _nearest_correlation(target)
+        for i in range(rounds):
+            drawn = self._draw(rows, np.random.default_rng(i))
+            achieved = np.corrcoef(np.vstack([_normal_scores(col) for col in drawn.T]))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(np.abs(achieved) > 0.02, target / achieved, 1.0)
+            latent = _nearest_correlation(np.clip(latent * np.clip(ratio, 0.5, 2.0), -0.99, 0.99))
+            self.factor = np.linalg.cholesky(latent)
+
+    def _quantile(self, col, u):
+        sample = self.marginals[col]
+        n = len(sample)
+        if SCHEMA[col] == "float":
+            # Interpolate so continuous columns get new values, at the file's precision
+            return np.round(np.interp(u, (np.arange(n) + 0.5) / n, sample), 2)
+        return sample[np.minimum((u * n).astype(np.int64), n - 1)]
+
+    def sample(self, rows, rng, first_id=0):
+        """`rows` synthetic rows with the SCHEMA columns and dtypes."""
+        drawn = self._draw(rows, rng)
+        out = {}
+        for j, col in enumerate(self.columns):
+            values = drawn[:, j]
+            if col in self.categories:
+                values = pd.Categorical.from_codes(values.astype(np.int32), self.categories[col])
+            out[col] = values
+
+        out["Case_Number"] = np.arange(first_id, first_id + rows, dtype=np.int64)
+        for col, (source, mapping) in self.lookups.items():
+            out[col] = pd.Series(out[source]).map(mapping).to_numpy()
+        out["Start_time"] = pd.Categorical(out["Start_time"])
+        return apply_schema(pd.DataFrame({col: out[col] for col in SCHEMA}))
+
+
+def _read_source(source):
+    return pd.read_parquet(source) if str(source).endswith(".parquet") else pd.read_csv(source)
+
+
+def iter_batches(model, rows, seed=0, batch_rows=BATCH_ROWS):
+    """Yield DataFrames of at most `batch_rows` rows, `rows` in total."""
+    starts = range(0, rows, batch_rows)
+    for start, child in zip(starts, np.random.SeedSequence(seed).spawn(len(starts))):
+        yield model.sample(min(batch_rows, rows - start), np.random.default_rng(child), first_id=start + 1)
+
+
+def generate(path, rows, seed=0, source=DATA_FILE, batch_rows=BATCH_ROWS, model=None):
+    """Write `rows` synthetic rows to `path` (.csv or .parquet); returns the path."""
+    path = Path(path)
+    model = model or CopulaModel.fit(_read_source(source))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    batches = iter_batches(model, rows, seed, batch_rows)
+
+    if path.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from ingest import _arrow_schema
+
+        with pq.ParquetWriter(tmp, _arrow_schema()) as writer:
+            for batch in batches:
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+                writer.write_table(table.cast(writer.schema))
+    else:
+        with open(tmp, "w", newline="", encoding="utf-8") as fh:
+            for i, batch in enumerate(batches):
+                batch.to_csv(fh, header=i == 0, index=False)
+    tmp.replace(path)
+    return path
+
+
+def correlation_report(real, synthetic, pairs=KEY_PAIRS):
+    """Spearman correlation of the key column pairs in both frames."""
+    return pd.DataFrame(
+        [{"pair": f"{a} ~ {b}",
+          "real": real[a].corr(real[b], method="spearman"),
+          "synthetic": synthetic[a].corr(synthetic[b], method="spearman")} for a, b in pairs]
+    ).set_index("pair")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic survey rows matching the dataset schema.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output", help="target .csv or .parquet file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=str(DATA_FILE), help="real survey file to fit")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args(argv)
+
+    real = apply_schema(normalize_columns(_read_source(args.source)))
+    model = CopulaModel.fit(real)
+    path = generate(args.output, args.rows, args.seed, batch_rows=args.batch_rows, model=model)
+    print(f"Wrote {args.rows:,} rows to {path}")
+    check = model.sample(min(args.rows, 100_000), np.random.default_rng(args.seed))
+    print(correlation_report(real, check).round(3).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import dataset
+from dataset import DATA_FILE, dataset_version
+
+
+def test_sidecar_write_keeps_current_and_survives_a_broken_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "CACHE_DIR", tmp_path)
+    version = dataset_version(DATA_FILE)
+    parsed = dataset._read(DATA_FILE, version)
+    current = dataset._sidecar_path(DATA_FILE, version)
+    stale = dataset._sidecar_path(DATA_FILE, "0" * 64)
+    stale.write_bytes(b"old")
+
+    # A second writer of the same version prunes only the other versions
+    assert dataset._write_sidecar(parsed, DATA_FILE, version)
+    assert current.exists() and not stale.exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # A sidecar truncated by a crashed writer is reparsed, not raised
+    current.write_bytes(current.read_bytes()[:100])
+    assert dataset._read(DATA_FILE, version).equals(parsed)
+
+
+def test_sidecar_is_not_reused_after_a_schema_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "CACHE_DIR", tmp_path)
+    version = dataset_version(DATA_FILE)
+    before = dataset._read(DATA_FILE, version)
+
+    # Schema tweak: Start_time is no longer a category
+    monkeypatch.setattr(dataset, "_parser", None)
+    monkeypatch.setitem(dataset.SCHEMA, "Start_time", "text")
+    after = dataset._read(DATA_FILE, version)
+    assert before["Start_time"].dtype == "category"
+    assert after["Start_time"].dtype != "category"
+    assert len(list(tmp_path.glob("*.feather"))) == 1  # the old parse was pruned
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from dataset import DATA_FILE, apply_schema, normalize_columns
+from features import derive_features
+from figures import FIGURES, figure_spec
+from sampling import POINT_BUDGET, sample_points
+
+
+def _survey_with_gaps(copies=20):
+    """The shipped survey repeated past the point budget, with a few missing values."""
+    raw = pd.concat([pd.read_csv(DATA_FILE)] * copies, ignore_index=True)
+    raw.loc[[3, 50, 700], "Trait_Anxiety"] = np.nan
+    raw.loc[[5, 90], "MEQ"] = np.nan  # -> missing Chronotype
+    raw.loc[[7], "Start_time_code"] = np.nan
+    df = derive_features(apply_schema(normalize_columns(raw)))
+    assert len(df) > POINT_BUDGET and df["Trait_Anxiety"].dtype.name.startswith("Int")
+    return df
+
+
+def test_sample_skips_missing_values_and_groups():
+    df = _survey_with_gaps()
+    for by, value in [(None, "Trait_Anxiety"), ("Chronotype", "Start_time_code"),
+                      ("Year_of_Study", "Trait_Anxiety")]:
+        sample, note = sample_points(df, by, value)
+        assert note is not None and 0 < len(sample) <= POINT_BUDGET
+        assert not sample[value].isna().any()
+        if by is not None:
+            assert not sample[by].isna().any()
+
+
+def test_every_figure_builds_with_missing_values():
+    df = _survey_with_gaps()
+    for figure_id in FIGURES:
+        figure_spec(figure_id, df)
@@ -0,0 +1,6 @@
+import startup_budget
+
+
+def test_pages_import_within_budget():
+    # Imports every page's leading block in fresh interpreters, several times (~15 s)
+    assert startup_budget.main([]) == 0